@@ -1,20 +1,74 @@
 import os
+import asyncio
+import hashlib
+import time
 import jwt
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from .cache import TTLCache
+from .revocation import get_revocation_list
+from .metrics import password_hash_duration
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-super-secret-key-change-this-to-a-very-long-random-string-please')
 ALGORITHM = "HS256"
 security = HTTPBearer()
 
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+# Hashes allowed to be running or queued before new ones are turned away with a 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_WORKERS * 4))
+
+# Recently verified tokens, keyed by SHA-256 of the token; entries never outlive the token's exp
+token_cache = TTLCache(
+    maxsize=int(os.getenv('TOKEN_CACHE_SIZE', 4096)),
+    ttl=float(os.getenv('TOKEN_CACHE_TTL', 300))
+)
+
+# bcrypt releases the GIL while hashing, so a thread pool gives real parallelism
+hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending_hashes = 0
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    started = time.perf_counter()
+    try:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS)).decode('utf-8')
+    finally:
+        password_hash_duration.observe(time.perf_counter() - started, operation="hash")
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    started = time.perf_counter()
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    finally:
+        password_hash_duration.observe(time.perf_counter() - started, operation="verify")
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def _run_hash(func, *args):
+    global _pending_hashes
+    if _pending_hashes >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+    _pending_hashes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hash_executor, func, *args)
+    finally:
+        _pending_hashes -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_hash(verify_password, password, hashed)
 
 def create_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -26,11 +80,22 @@ def create_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # Declared async so the hot path (a cache hit) does not hop to a worker thread
+    token = credentials.credentials
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = token_cache.get(key)
+    
+    if payload is None or payload.get("exp", 0) <= time.time():
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            token_cache.invalidate(key)
+            raise HTTPException(status_code=401, detail="Token expired")
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        token_cache.set(key, payload)
+    
+    if get_revocation_list().is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
@@ -0,0 +1,172 @@
+import csv
+import json
+import codecs
+from collections import deque
+from pydantic import ValidationError
+from .models import Product
+
+PRODUCT_FIELDS = ("id", "name", "description", "price", "stock", "category_id", "category", "color", "material", "size")
+
+class RowError(Exception):
+    """A single input row could not be parsed or validated."""
+
+async def iter_lines(stream):
+    """Yield decoded lines (newline included) from an async byte stream without buffering the whole body.
+
+    Lines end only at \n (or \r\n): str.splitlines would also split on
+    characters such as U+2028 that may appear inside a JSON string or CSV field.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+class _NeedMoreLines(Exception):
+    pass
+
+class _LineFeed:
+    """Line iterator for a csv.reader that is filled from an async stream.
+
+    When the reader needs a line that has not arrived yet, the lines of the
+    unfinished record are put back and _NeedMoreLines is raised; the reader
+    starts that record over on its next call.
+    """
+
+    def __init__(self):
+        self.lines = deque()
+        self.record = []
+        self.closed = False
+        self.ended_in_record = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            if not self.closed:
+                self.lines.extendleft(reversed(self.record))
+                raise _NeedMoreLines()
+            self.ended_in_record = bool(self.record)
+            raise StopIteration
+        line = self.lines.popleft()
+        self.record.append(line)
+        return line
+
+def _read_records(reader, feed):
+    """Yield the complete records (a list of fields, or a RowError) available in feed."""
+    while True:
+        feed.record = []
+        try:
+            fields = next(reader)
+        except (_NeedMoreLines, StopIteration):
+            return
+        except csv.Error as e:
+            yield RowError(f"Invalid CSV: {str(e)}")
+            continue
+        if feed.ended_in_record:
+            yield RowError("Unterminated quoted field")
+        elif fields:
+            yield fields
+
+async def iter_csv_records(lines):
+    """Yield (row number, dict) per CSV record; the first record is the header.
+
+    One csv.reader parses the whole stream, so quoting (including fields that
+    span lines) is handled by the csv module.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    row_number = 0
+
+    def records():
+        nonlocal header, row_number
+        for fields in _read_records(reader, feed):
+            if header is None and not isinstance(fields, RowError):
+                header = [field.strip().lower() for field in fields]
+                continue
+            row_number += 1
+            if isinstance(fields, RowError):
+                yield row_number, fields
+            elif len(fields) != len(header):
+                yield row_number, RowError(f"Expected {len(header)} columns, got {len(fields)}")
+            else:
+                yield row_number, dict(zip(header, fields))
+    
+    async for line in lines:
+        feed.lines.append(line)
+        for record in records():
+            yield record
+    feed.closed = True
+    # A final line without a newline still ends its record
+    if feed.lines and not feed.lines[-1].endswith(("\n", "\r")):
+        feed.lines[-1] += "\n"
+    for record in records():
+        yield record
+
+async def iter_ndjson_records(lines):
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, RowError(f"Invalid JSON: {str(e)}")
+            continue
+        yield row_number, data if isinstance(data, dict) else RowError("Expected a JSON object")
+
+def validate_product(raw: dict, categories: dict, category_ids: dict):
+    """Validate one input row against the Product model and the preloaded category lookup.
+
+    categories maps id -> name, category_ids maps lowercased name -> id. Returns
+    (product id or None, Product with the canonical category name).
+    """
+    data = {}
+    for field in PRODUCT_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            data[field] = value
+    unknown = set(raw) - set(PRODUCT_FIELDS)
+    if unknown:
+        raise RowError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    
+    if "category_id" in data:
+        try:
+            category_id = int(data["category_id"])
+        except (TypeError, ValueError):
+            raise RowError("category_id: must be an integer")
+        if category_id not in categories:
+            raise RowError(f"Category {category_id} does not exist")
+    elif "category" in data:
+        category_id = category_ids.get(str(data["category"]).lower())
+        if category_id is None:
+            raise RowError(f"Category '{data['category']}' does not exist")
+    else:
+        raise RowError("category_id or category is required")
+    data["category_id"] = category_id
+    data["category"] = categories[category_id]
+    data.setdefault("description", "")
+    
+    product_id = data.pop("id", None)
+    if product_id is not None:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise RowError("id: must be an integer")
+    try:
+        product = Product(**data)
+    except ValidationError as e:
+        raise RowError("; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()))
+    if product.price < 0 or product.stock < 0:
+        raise RowError("price and stock must not be negative")
+    return product_id, product
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from .workers import publish, subscribe, on_resync
+from .responses import dumps
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+    Entries can carry tags so that a write can drop every entry derived from
+    a given row (e.g. all product pages containing product 7) in one call.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key):
+        """Return a live entry without counting a hit or miss or refreshing its LRU position."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def generation(self) -> int:
+        """Counter bumped by every invalidation; pass it to set() to avoid caching stale reads."""
+        return self._generation
+
+    def set(self, key, value, tags=(), generation=None):
+        with self._lock:
+            # An invalidation ran while the value was being computed: it may be stale.
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            if key in self._data:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            self._generation += 1
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+            self._tags.clear()
+
+    def load_json(self, key, loader, tags=None):
+        """Run loader(), store its JSON-encoded result under key and return the bytes.
+
+        tags, if given, is called with the loaded data and returns the entry's tags.
+        Meant to run on the DB executor on a cache miss.
+        """
+        generation = self.generation()
+        data = loader()
+        body = json_bytes(data)
+        self.set(key, body, tags(data) if tags else (), generation=generation)
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+def json_bytes(data) -> bytes:
+    return dumps(data)
+
+catalog_cache = TTLCache(
+    maxsize=int(os.getenv('CATALOG_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('CATALOG_CACHE_TTL', 60))
+)
+
+# Tags used for catalog entries
+PRODUCT_LISTINGS = "products"
+CATEGORIES_KEY = "categories"
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+def product_images_key(product_id: int) -> str:
+    return f"images:{product_id}"
+
+def invalidate_product_listings():
+    """A product was added or changed in a way that can move it between listings."""
+    catalog_cache.invalidate_tag(PRODUCT_LISTINGS)
+    publish("cache.listings", "")
+
+def invalidate_products(product_ids):
+    """Drop the listing pages that currently show any of these products."""
+    for product_id in product_ids:
+        catalog_cache.invalidate_tag(product_tag(product_id))
+    publish("cache.product", *product_ids)
+
+def invalidate_product_images(product_id: int):
+    catalog_cache.invalidate(product_images_key(product_id))
+    invalidate_products([product_id])
+    publish("cache.images", product_id)
+
+# The same invalidations, announced by other worker processes
+subscribe("cache.listings", lambda payload: catalog_cache.invalidate_tag(PRODUCT_LISTINGS))
+subscribe("cache.product", lambda payload: catalog_cache.invalidate_tag(product_tag(int(payload))))
+subscribe("cache.images", lambda payload: catalog_cache.invalidate(product_images_key(int(payload))))
+on_resync(catalog_cache.clear)
@@ -1,7 +1,15 @@
 import os
+import time
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import mysql.connector
 from mysql.connector import Error
-from mysql.connector.pooling import MySQLConnectionPool
 from dotenv import load_dotenv
+from .pool import ConnectionPool, PoolTimeout
+from .metrics import InstrumentedConnection, db_pool_wait, db_pool_errors
+from .versions import table_versions
 
 load_dotenv()
 
@@ -10,27 +18,78 @@ DATABASE_CONFIG = {
     'user': os.getenv('DB_USER', 'root'),
     'password': os.getenv('DB_PASSWORD', 'root'),
     'database': os.getenv('DB_NAME', 'ss_bags'),
-    'port': int(os.getenv('DB_PORT', 3306))
+    'port': int(os.getenv('DB_PORT', 3306)),
+    'connection_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10))
 }
 
-# Initialize connection pool
-try:
-    db_pool = MySQLConnectionPool(
-        pool_name="mypool",
-        pool_size=10,
-        pool_reset_session=True,
-        **DATABASE_CONFIG
-    )
-    print("Database connection pool created successfully")
-except Error as e:
-    print(f"Error creating connection pool: {e}")
-    exit(1)
-
-def get_db():
+# Optional read replica for read-only endpoints; unset means everything goes to the primary
+REPLICA_CONFIG = {
+    **DATABASE_CONFIG,
+    'host': os.getenv('DB_REPLICA_HOST'),
+    'port': int(os.getenv('DB_REPLICA_PORT', DATABASE_CONFIG['port'])),
+    'user': os.getenv('DB_REPLICA_USER', DATABASE_CONFIG['user']),
+    'password': os.getenv('DB_REPLICA_PASSWORD', DATABASE_CONFIG['password']),
+} if os.getenv('DB_REPLICA_HOST') else None
+
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+REPLICA_POOL_SIZE = int(os.getenv('DB_REPLICA_POOL_SIZE', POOL_SIZE)) if REPLICA_CONFIG else 0
+# Read-only requests stay on the primary for this many seconds after any write, so
+# a listing reloaded right after an edit is not cached or ETagged from a lagging replica
+REPLICA_WRITE_GRACE = float(os.getenv('DB_REPLICA_WRITE_GRACE', 2))
+# Seconds a request waits for a free connection before getting a 503
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+# Idle connections are pinged this often (seconds) and dropped if dead; 0 disables
+POOL_VALIDATE_INTERVAL = float(os.getenv('DB_POOL_VALIDATE_INTERVAL', 30))
+
+# Connections are opened on first use, so creating the pools never touches MySQL
+db_pool = ConnectionPool("primary", DATABASE_CONFIG, POOL_SIZE, POOL_TIMEOUT, POOL_VALIDATE_INTERVAL)
+replica_pool = ConnectionPool(
+    "replica", REPLICA_CONFIG, REPLICA_POOL_SIZE, POOL_TIMEOUT, POOL_VALIDATE_INTERVAL
+) if REPLICA_CONFIG else None
+
+# Blocking mysql.connector calls run on this executor instead of the event loop.
+# It has one thread per pooled connection, so threads are never the bottleneck
+# and a thread only waits when the pool it needs is fully checked out.
+db_executor = ThreadPoolExecutor(max_workers=POOL_SIZE + REPLICA_POOL_SIZE, thread_name_prefix="db")
+
+def get_db(readonly: bool = False):
+    """Check out a connection; readonly=True routes to the replica when one is configured.
+
+    Read-only callers must tolerate replication lag: anything that reads its
+    own writes, or locks rows, belongs on the primary.
+    """
+    use_replica = readonly and replica_pool is not None and table_versions.seconds_since_write() >= REPLICA_WRITE_GRACE
+    pool = replica_pool if use_replica else db_pool
+    started = time.perf_counter()
     try:
-        conn = db_pool.get_connection()
-        conn.autocommit = False
-        return conn
+        conn = pool.get_connection()
+        db_pool_wait.observe(time.perf_counter() - started, pool=pool.name)
+        return InstrumentedConnection(conn, pool=pool.name)
+    except PoolTimeout as e:
+        db_pool_errors.inc(pool=pool.name, reason="timeout")
+        from fastapi import HTTPException
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Error as e:
+        db_pool_errors.inc(pool=pool.name, reason="connect")
         from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+def connect_unpooled(readonly: bool = False):
+    """Open a dedicated connection outside the pool, for long-running streaming reads.
+
+    Close it with shutdown() so any unread rows are dropped with the socket
+    instead of being drained.
+    """
+    config = REPLICA_CONFIG if readonly and REPLICA_CONFIG else DATABASE_CONFIG
+    try:
+        return InstrumentedConnection(mysql.connector.connect(**config), pool=None)
+    except Error as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(db_executor, call)
@@ -0,0 +1,98 @@
+import os
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
+from .cache import TTLCache
+from .database import get_db, run_db
+
+# How long a key keeps replaying its order (seconds)
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 24 * 3600))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv('IDEMPOTENCY_PURGE_INTERVAL', 3600))
+
+# (user_id, key) -> (request_hash, order_id); replays that hit this never reach MySQL
+idempotency_cache = TTLCache(
+    maxsize=int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000)),
+    ttl=IDEMPOTENCY_TTL
+)
+
+class KeyInUse(Exception):
+    """Another request holding the same key committed first; replay its result."""
+
+def request_hash(body: str) -> str:
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+def replay(user_id: int, key: str, fingerprint: str, stored_hash: str, order_id):
+    if stored_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    idempotency_cache.set((user_id, key), (stored_hash, order_id))
+    return {"message": "Order created successfully", "order_id": order_id}
+
+def find_cached(user_id: int, key: str, fingerprint: str):
+    cached = idempotency_cache.get((user_id, key))
+    if cached is None:
+        return None
+    return replay(user_id, key, fingerprint, *cached)
+
+def find_stored(cursor, user_id: int, key: str, fingerprint: str):
+    """The replayed response for a committed, unexpired key, or None. Takes no locks."""
+    cursor.execute(
+        "SELECT request_hash, order_id FROM idempotency_keys WHERE user_id = %s AND idempotency_key = %s AND created_at > %s",
+        (user_id, key, datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL))
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return replay(user_id, key, fingerprint, row['request_hash'], row['order_id'])
+
+def claim(cursor, user_id: int, key: str, fingerprint: str):
+    """Insert the key row as the transaction's first write.
+
+    A concurrent request with the same key blocks on this row's primary key
+    until the first one commits (and then gets KeyInUse) or rolls back (and
+    then proceeds), so only one of them ever locks products.
+    """
+    cursor.execute(
+        "DELETE FROM idempotency_keys WHERE user_id = %s AND idempotency_key = %s AND created_at <= %s",
+        (user_id, key, datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL))
+    )
+    try:
+        cursor.execute(
+            "INSERT INTO idempotency_keys (user_id, idempotency_key, request_hash, created_at) VALUES (%s, %s, %s, %s)",
+            (user_id, key, fingerprint, datetime.now())
+        )
+    except IntegrityError as e:
+        if e.errno == errorcode.ER_DUP_ENTRY:
+            raise KeyInUse()
+        raise
+
+def record(cursor, user_id: int, key: str, order_id: int):
+    cursor.execute(
+        "UPDATE idempotency_keys SET order_id = %s WHERE user_id = %s AND idempotency_key = %s",
+        (order_id, user_id, key)
+    )
+
+def purge_expired():
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(
+            "DELETE FROM idempotency_keys WHERE created_at <= %s",
+            (datetime.now() - timedelta(seconds=IDEMPOTENCY_TTL),)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.close()
+
+async def purge_periodically(interval: float = IDEMPOTENCY_PURGE_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_db(purge_expired)
+        except Exception as e:
+            print(f"Idempotency key purge failed: {str(e)}")
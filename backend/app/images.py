@@ -0,0 +1,173 @@
+import os
+import glob
+import asyncio
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import UploadFile
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it only originals are stored
+    Image = None
+
+UPLOAD_DIR = "uploads"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Longest edge in pixels for each generated variant
+IMAGE_VARIANTS = {
+    "thumbnail": int(os.getenv('IMAGE_THUMBNAIL_SIZE', 320)),
+    "medium": int(os.getenv('IMAGE_MEDIUM_SIZE', 960)),
+}
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'webp').lower()
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+
+# Disk writes and Pillow work (which releases the GIL while decoding, resizing
+# and encoding) run here rather than on the event loop.
+image_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('IMAGE_WORKERS', min(4, os.cpu_count() or 1))),
+    thread_name_prefix="images"
+)
+
+def _variant_format() -> str:
+    if IMAGE_VARIANT_FORMAT == "avif" and features.check("avif"):
+        return "avif"
+    return "webp"
+
+async def save_upload(file: UploadFile):
+    """Stream an upload to a temporary file in chunks, hashing it on the way.
+
+    Returns (temp path, sha256 hex digest).
+    """
+    path = os.path.join(UPLOAD_DIR, f".upload-{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    loop = asyncio.get_running_loop()
+    
+    await file.seek(0)
+    out = await loop.run_in_executor(image_executor, open, path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await loop.run_in_executor(image_executor, out.write, chunk)
+    except Exception:
+        await loop.run_in_executor(image_executor, out.close)
+        remove_files([path])
+        raise
+    await loop.run_in_executor(image_executor, out.close)
+    return path, digest.hexdigest()
+
+def generate_variants(source_path: str, content_hash: str) -> dict:
+    """Write resized, compressed copies of an image to temporary files.
+
+    Returns {variant name: (temp path, final path)}; empty if Pillow is
+    unavailable or the file cannot be decoded, in which case only the
+    original is served.
+    """
+    if Image is None:
+        return {}
+    
+    fmt = _variant_format()
+    variants = {}
+    try:
+        with Image.open(source_path) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            for name, size in IMAGE_VARIANTS.items():
+                variant = image.copy()
+                variant.thumbnail((size, size), Image.LANCZOS)
+                temp_path = os.path.join(UPLOAD_DIR, f".variant-{uuid.uuid4().hex}.tmp")
+                variant.save(temp_path, fmt.upper(), quality=IMAGE_VARIANT_QUALITY)
+                variants[name] = (temp_path, os.path.join(UPLOAD_DIR, f"{content_hash}_{name}.{fmt}"))
+    except Exception as e:
+        print(f"Could not generate variants for {source_path}: {str(e)}")
+        remove_files(temp for temp, _ in variants.values())
+        return {}
+    return variants
+
+def _original_path(source_path: str, content_hash: str, filename: str) -> str:
+    """The copy of this content already on disk, else <hash>.<ext> named after
+    the format Pillow detects, so the same bytes never get two originals."""
+    existing = sorted(glob.glob(os.path.join(UPLOAD_DIR, glob.escape(content_hash) + ".*")))
+    if existing:
+        return existing[0]
+    ext = None
+    if Image is not None:
+        try:
+            with Image.open(source_path) as image:
+                ext = {"JPEG": "jpg", "MPO": "jpg", "TIFF": "tif"}.get(image.format, (image.format or "").lower())
+        except Exception:
+            pass
+    if not ext:
+        ext = os.path.splitext(filename or "")[1].lstrip(".").lower() or "bin"
+    return os.path.join(UPLOAD_DIR, f"{content_hash}.{ext}")
+
+def _existing_variants(content_hash: str) -> dict:
+    fmt = _variant_format()
+    paths = {name: os.path.join(UPLOAD_DIR, f"{content_hash}_{name}.{fmt}") for name in IMAGE_VARIANTS}
+    return paths if all(os.path.exists(path) for path in paths.values()) else None
+
+async def process_upload(file: UploadFile) -> dict:
+    """Save an upload and build its variants off the event loop.
+
+    Files are stored under their content hash, so identical uploads share
+    one copy. Nothing is visible under uploads/ until materialize() runs,
+    which the caller does inside the transaction that records the image.
+    Returns {"content_hash", "original", "thumbnail", "medium", "pending"}
+    where pending lists (temp path, final path) moves, plus "reused_variants"
+    when the variants already existed.
+    """
+    temp_path, content_hash = await save_upload(file)
+    loop = asyncio.get_running_loop()
+    final_path = await loop.run_in_executor(image_executor, _original_path, temp_path, content_hash, file.filename)
+    stored = {"content_hash": content_hash, "original": final_path, "pending": [(temp_path, final_path)]}
+    
+    existing = _existing_variants(content_hash)
+    if existing is not None:
+        # Same photo uploaded before: reuse its variants
+        stored.update(existing)
+        stored["reused_variants"] = True
+        return stored
+    
+    variants = await loop.run_in_executor(image_executor, generate_variants, temp_path, content_hash)
+    for name in IMAGE_VARIANTS:
+        temp, final = variants.get(name, (None, None))
+        stored[name] = final
+        if temp:
+            stored["pending"].append((temp, final))
+    return stored
+
+def materialize(stored: dict):
+    """Move an upload's temp files to their content-addressed names, keeping any existing copy.
+
+    Call after inserting the image row. Variants process_upload found on disk
+    may have been removed since by a delete of the same content; they are
+    generated again from the original.
+    """
+    if stored.get("reused_variants") and _existing_variants(stored["content_hash"]) is None:
+        temp_original = stored["pending"][0][0]
+        stored["pending"].extend(generate_variants(temp_original, stored["content_hash"]).values())
+    for temp, final in stored["pending"]:
+        if os.path.exists(final):
+            os.remove(temp)
+        else:
+            os.replace(temp, final)
+    stored["pending"] = []
+
+def discard(stored: dict):
+    remove_files(temp for temp, _ in stored["pending"])
+    stored["pending"] = []
+
+def path_to_url(path):
+    return f"/{UPLOAD_DIR}/{os.path.basename(path)}" if path else None
+
+def url_to_path(url):
+    return os.path.join(UPLOAD_DIR, os.path.basename(url)) if url else None
+
+def remove_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,282 @@
+import os
+import time
+import itertools
+import threading
+from collections import defaultdict, deque
+from .database import get_db
+from .cache import invalidate_products
+from .versions import table_versions
+
+# "db" locks product rows in every checkout; "memory" reserves stock from in-process counters
+INVENTORY_ENGINE = os.getenv('INVENTORY_ENGINE', 'db')
+INVENTORY_FLUSH_INTERVAL = float(os.getenv('INVENTORY_FLUSH_INTERVAL', 0.2))
+INVENTORY_FLUSH_BATCH = int(os.getenv('INVENTORY_FLUSH_BATCH', 500))
+INVENTORY_RESERVATION_TTL = float(os.getenv('INVENTORY_RESERVATION_TTL', 30))
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: int, available: int):
+        super().__init__(f"Insufficient stock for product {product_id}")
+        self.product_id = product_id
+        self.available = available
+
+def apply_order_stock(cursor, orders):
+    """Write the stock changes of placed orders to products and inventory_logs.
+
+    `orders` is a list of (order_id, {product_id: quantity}). Only orders still
+    flagged stock_applied = FALSE are applied, and the flag is set in the same
+    transaction, so running this twice for an order (a retried flush, or a
+    restart reconciling after a crash) never decrements twice.
+    Returns the product ids whose stock changed.
+    """
+    if not orders:
+        return []
+    
+    order_placeholders = ", ".join(["%s"] * len(orders))
+    cursor.execute(
+        f"SELECT id FROM orders WHERE id IN ({order_placeholders}) AND stock_applied = FALSE ORDER BY id FOR UPDATE",
+        tuple(order_id for order_id, _ in orders)
+    )
+    unapplied = {row['id'] for row in cursor.fetchall()}
+    orders = [(order_id, quantities) for order_id, quantities in orders if order_id in unapplied]
+    if not orders:
+        return []
+    
+    totals = defaultdict(int)
+    for _, quantities in orders:
+        for product_id, quantity in quantities.items():
+            totals[product_id] += quantity
+    product_ids = sorted(totals)
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    
+    cursor.execute(
+        f"SELECT id, stock FROM products WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+        tuple(product_ids)
+    )
+    stock = {row['id']: row['stock'] for row in cursor.fetchall()}
+    
+    # One log row per order and product, as the row-locking checkout writes them
+    logs = []
+    for _, quantities in orders:
+        for product_id, quantity in quantities.items():
+            if product_id in stock:
+                logs.append((product_id, stock[product_id], stock[product_id] - quantity, "order_placed"))
+                stock[product_id] -= quantity
+    
+    cases = " ".join(["WHEN %s THEN %s"] * len(product_ids))
+    cursor.execute(
+        f"UPDATE products SET stock = stock - CASE id {cases} ELSE 0 END WHERE id IN ({placeholders})",
+        tuple(value for product_id in product_ids for value in (product_id, totals[product_id])) + tuple(product_ids)
+    )
+    cursor.executemany(
+        "INSERT INTO inventory_logs (product_id, old_stock, new_stock, action) VALUES (%s, %s, %s, %s)",
+        logs
+    )
+    cursor.execute(
+        f"UPDATE orders SET stock_applied = TRUE WHERE id IN ({', '.join(['%s'] * len(orders))})",
+        tuple(order_id for order_id, _ in orders)
+    )
+    return product_ids
+
+def reconcile_unapplied_orders():
+    """Apply the stock of orders committed by the memory engine but never flushed (e.g. after a crash)."""
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute(
+            "SELECT oi.order_id, oi.product_id, oi.quantity FROM orders o JOIN order_items oi ON oi.order_id = o.id WHERE o.stock_applied = FALSE ORDER BY oi.order_id"
+        )
+        orders = {}
+        for item in cursor.fetchall():
+            quantities = orders.setdefault(item['order_id'], {})
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+        
+        product_ids = apply_order_stock(cursor, list(orders.items()))
+        conn.commit()
+        if orders:
+            print(f"Inventory reconciliation applied stock for {len(orders)} unflushed orders")
+        return product_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+class InventoryEngine:
+    """In-process stock counters with reservations and write-behind to MySQL.
+
+    Checkout reserves units from the counters under a short in-process lock
+    instead of InnoDB row locks, commits the order with stock_applied = FALSE,
+    then confirms the reservation. A background thread writes confirmed orders
+    to products.stock and inventory_logs in batches (apply_order_stock); orders
+    it never got to are applied at the next startup. Counters are loaded from
+    products.stock on first use as stock - unflushed - reserved, so they agree
+    with what the table will hold once everything is flushed.
+
+    The counters live in one process: run a single worker with this engine.
+    """
+
+    def __init__(self, flush_interval: float = INVENTORY_FLUSH_INTERVAL, reservation_ttl: float = INVENTORY_RESERVATION_TTL):
+        self.flush_interval = flush_interval
+        self.reservation_ttl = reservation_ttl
+        self._lock = threading.Lock()
+        # Serializes flushes with counter loads, so a load never sees a half-flushed state
+        self._flush_lock = threading.Lock()
+        self._available = {}  # product_id -> units free to reserve
+        self._reserved = defaultdict(int)  # product_id -> units held by open reservations
+        self._unflushed = defaultdict(int)  # product_id -> units confirmed but not yet in products.stock
+        self._reservations = {}  # reservation id -> (quantities, expires_at)
+        self._pending = deque()  # (order_id, quantities) waiting for the next flush
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reserve(self, cursor, quantities: dict) -> int:
+        """Hold units of each product atomically; raises InsufficientStock if any is short.
+
+        Counters not loaded yet are read on the checkout's own cursor, so a cold
+        cache never needs a second pooled connection.
+        """
+        self._load(cursor, quantities)
+        with self._lock:
+            for product_id, quantity in quantities.items():
+                available = self._available.get(product_id)
+                if available is None or available < quantity:
+                    raise InsufficientStock(product_id, max(available or 0, 0))
+            for product_id, quantity in quantities.items():
+                self._available[product_id] -= quantity
+                self._reserved[product_id] += quantity
+            reservation_id = next(self._ids)
+            self._reservations[reservation_id] = (dict(quantities), time.monotonic() + self.reservation_ttl)
+            return reservation_id
+
+    def release(self, reservation_id: int):
+        """Return a reservation's units; a no-op once it was confirmed or expired."""
+        with self._lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is not None:
+                self._return_units(reservation[0])
+
+    def confirm(self, reservation_id: int, order_id: int, quantities: dict) -> dict:
+        """Turn a reservation into a committed order queued for flushing; returns remaining units per product."""
+        with self._lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                # Expired while the order transaction ran; the order is committed, so take the units anyway
+                print(f"Reservation {reservation_id} expired before order {order_id} was confirmed")
+            for product_id, quantity in quantities.items():
+                if reservation is not None:
+                    self._reserved[product_id] -= quantity
+                elif product_id in self._available:
+                    self._available[product_id] -= quantity
+                self._unflushed[product_id] += quantity
+            self._pending.append((order_id, dict(quantities)))
+            return {product_id: self._available.get(product_id, 0) for product_id in quantities}
+
+    def forget(self, product_id: int):
+        """Drop a counter after products.stock was changed directly (admin edit, delete); it reloads on next use."""
+        with self._lock:
+            self._available.pop(product_id, None)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inventory-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush everything still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        while self.flush():
+            pass
+
+    def flush(self) -> int:
+        """Write up to INVENTORY_FLUSH_BATCH confirmed orders to MySQL; returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), INVENTORY_FLUSH_BATCH))]
+            if not batch:
+                return 0
+            
+            conn = get_db()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                product_ids = apply_order_stock(cursor, batch)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                with self._lock:
+                    self._pending.extendleft(reversed(batch))
+                print(f"Inventory flush failed, will retry: {str(e)}")
+                return 0
+            finally:
+                cursor.close()
+                conn.close()
+            
+            with self._lock:
+                for _, quantities in batch:
+                    for product_id, quantity in quantities.items():
+                        self._unflushed[product_id] -= quantity
+                        if not self._unflushed[product_id]:
+                            del self._unflushed[product_id]
+        
+        invalidate_products(product_ids)
+        table_versions.bump("products")
+        return len(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "products": len(self._available),
+                "reservations": len(self._reservations),
+                "pending_orders": len(self._pending),
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._expire_reservations()
+            try:
+                while self.flush() == INVENTORY_FLUSH_BATCH:
+                    pass
+            except Exception as e:
+                print(f"Inventory flush error: {str(e)}")
+
+    def _expire_reservations(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [reservation_id for reservation_id, (_, expires_at) in self._reservations.items() if expires_at <= now]
+            for reservation_id in expired:
+                self._return_units(self._reservations.pop(reservation_id)[0])
+        if expired:
+            print(f"Released {len(expired)} expired inventory reservations")
+
+    def _return_units(self, quantities):
+        for product_id, quantity in quantities.items():
+            self._reserved[product_id] -= quantity
+            if product_id in self._available:
+                self._available[product_id] += quantity
+
+    def _load(self, cursor, product_ids):
+        with self._lock:
+            missing = sorted(product_id for product_id in product_ids if product_id not in self._available)
+        if not missing:
+            return
+        
+        with self._flush_lock:
+            # A locking read sees the latest committed stock, not the caller's transaction snapshot,
+            # which may predate a flush that has since lowered _unflushed
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(
+                f"SELECT id, stock FROM products WHERE id IN ({placeholders}) ORDER BY id LOCK IN SHARE MODE",
+                tuple(missing)
+            )
+            rows = cursor.fetchall()
+            
+            with self._lock:
+                for row in rows:
+                    if row['id'] not in self._available:
+                        self._available[row['id']] = row['stock'] - self._unflushed[row['id']] - self._reserved[row['id']]
+
+inventory_engine = InventoryEngine() if INVENTORY_ENGINE == "memory" else None
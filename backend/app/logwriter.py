@@ -0,0 +1,163 @@
+import os
+import time
+import queue
+import threading
+from datetime import datetime
+from mysql.connector import Error
+from mysql.connector.errors import IntegrityError
+from .database import get_db
+
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 500))
+# How long the worker waits for a batch to fill before writing what it has (seconds)
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 0.5))
+# How long write() blocks on a full queue before inserting inline (seconds)
+LOG_ENQUEUE_TIMEOUT = float(os.getenv('LOG_ENQUEUE_TIMEOUT', 1))
+# Attempts per batch before its rows are given up on and printed to the server log
+LOG_WRITE_ATTEMPTS = int(os.getenv('LOG_WRITE_ATTEMPTS', 5))
+
+LOG_STATEMENTS = {
+    "activity_logs": "INSERT INTO activity_logs (admin_id, action, details, created_at) VALUES (%s, %s, %s, %s)",
+    "inventory_logs": "INSERT INTO inventory_logs (product_id, old_stock, new_stock, action, created_at) VALUES (%s, %s, %s, %s, %s)",
+}
+
+class LogWriter:
+    """Writes activity_logs/inventory_logs rows from a background thread in batches.
+
+    Request handlers enqueue rows after their transaction commits, so the
+    transaction no longer carries the log inserts. Rows keep the time they were
+    enqueued as created_at. When the queue is full, write() blocks for up to
+    LOG_ENQUEUE_TIMEOUT and then inserts inline (as it does when the worker is
+    not running) on the caller's connection, so records are delayed but not
+    dropped and no second pooled connection is taken; stop() drains the
+    queue on shutdown. A batch that still fails after LOG_WRITE_ATTEMPTS is
+    printed to the server log instead. Rows still queued when the process is
+    killed are lost.
+    """
+
+    def __init__(self, maxsize: int = LOG_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "batches": 0, "inline": 0, "failed": 0}
+
+    def write(self, table: str, *rows, conn):
+        """Queue rows (tuples matching LOG_STATEMENTS[table], without created_at) for insertion.
+
+        `conn` is the caller's connection, after its transaction committed; it
+        is only used for an inline insert.
+        """
+        now = datetime.now()
+        rows = [tuple(row) + (now,) for row in rows]
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                for index, row in enumerate(rows):
+                    self._queue.put((table, row), timeout=LOG_ENQUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                rows = rows[index:]
+        # Backpressure: the caller pays for its own insert rather than growing the queue
+        self._count("inline", len(rows))
+        try:
+            self._insert({table: rows}, conn)
+        except Exception as e:
+            # The caller's transaction has already committed; keep the record in the server log at least
+            self._count("failed", len(rows))
+            print(f"Could not write {table} rows {rows}: {str(e)}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Write everything queued so far and stop the worker."""
+        if self._thread is None:
+            return
+        self._queue.put((None, None))
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            table, row = self._queue.get()
+            if table is None:
+                break
+            batch = {table: [row]}
+            size = 1
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while size < LOG_BATCH_SIZE:
+                try:
+                    table, row = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if table is None:
+                    stopping = True
+                    break
+                batch.setdefault(table, []).append(row)
+                size += 1
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        delay = 0.5
+        for attempt in range(1, LOG_WRITE_ATTEMPTS + 1):
+            try:
+                self._insert(batch)
+                self._count("batches")
+                return
+            except Exception as e:
+                if attempt == LOG_WRITE_ATTEMPTS:
+                    # A persistent failure (e.g. a dropped column) must not stall the worker or stop()
+                    rows = sum(len(table_rows) for table_rows in batch.values())
+                    self._count("failed", rows)
+                    print(f"Log writer giving up on a batch of {rows} rows after {attempt} attempts: {str(e)}")
+                    for table, table_rows in batch.items():
+                        for row in table_rows:
+                            print(f"Dead-lettered {table} row {row}")
+                    return
+                # Keep the rows and retry; meanwhile new rows queue up and then fall back to inline writes
+                print(f"Log writer batch failed, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _insert(self, batch, conn=None):
+        """Insert a batch in one transaction, on `conn` if given (left open) or on a new connection."""
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db()
+        cursor = conn.cursor()
+        dropped = 0
+        
+        try:
+            for table, rows in batch.items():
+                try:
+                    # mysql.connector sends an executemany INSERT as one multi-row statement
+                    cursor.executemany(LOG_STATEMENTS[table], rows)
+                except IntegrityError:
+                    # e.g. the product was deleted meanwhile; keep every row that can still be stored
+                    for row in rows:
+                        try:
+                            cursor.execute(LOG_STATEMENTS[table], row)
+                        except IntegrityError as e:
+                            dropped += 1
+                            print(f"Dropping {table} row {row}: {str(e)}")
+            conn.commit()
+            self._count("written", sum(len(rows) for rows in batch.values()) - dropped)
+            self._count("failed", dropped)
+        except Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if own_conn:
+                conn.close()
+
+log_writer = LogWriter()
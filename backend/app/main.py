@@ -1,18 +1,69 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from .database import get_db
-from .routers import users, products, orders, admin
+from .database import get_db, run_db, db_executor, db_pool, replica_pool
+from .cache import catalog_cache, CATEGORIES_KEY
+from .revocation import get_revocation_list
+from .static import ContentAddressedStaticFiles
+from .responses import FastJSONResponse
+from .middleware import ETagMiddleware, CompressionMiddleware, WorkerSyncMiddleware
+from .metrics import MetricsMiddleware, render_metrics, db_pool_open, db_pool_waiting
+from .ratelimit import LoadSheddingMiddleware
+from .stats import dashboard_stats, reconcile_periodically
+from .search import search_index
+from .idempotency import purge_periodically as purge_idempotency_keys
+from .inventory import inventory_engine, reconcile_unapplied_orders
+from .logwriter import log_writer
+from .workers import on_resync
+from .routers import users, products, orders, admin, exports
 
 load_dotenv()
 
+def _load_revoked_users():
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT id FROM users WHERE status <> 'active'")
+        get_revocation_list().load("user", [row[0] for row in cursor.fetchall()])
+    finally:
+        cursor.close()
+        conn.close()
+
+# Revocations announced by other workers were missed; reload them all
+on_resync(lambda: db_executor.submit(_load_revoked_users))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_writer.start()
+    await run_db(_load_revoked_users)
+    await run_db(dashboard_stats.reconcile)
+    if inventory_engine is not None:
+        # Orders committed but not flushed before the last shutdown/crash, before counters load
+        await run_db(reconcile_unapplied_orders)
+        inventory_engine.start()
+    await run_db(search_index.rebuild)
+    stats_task = asyncio.create_task(reconcile_periodically())
+    idempotency_task = asyncio.create_task(purge_idempotency_keys())
+    yield
+    stats_task.cancel()
+    idempotency_task.cancel()
+    if inventory_engine is not None:
+        await run_db(inventory_engine.stop)
+    # Last, so log rows queued by the shutdown steps above are written too
+    await run_db(log_writer.stop)
+
 app = FastAPI(
     title="PK Shop API",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -20,6 +71,14 @@ allowed_origins = [os.getenv('FRONTEND_URL', 'http://localhost:3000')]
 if os.getenv('DEV_MODE', '').lower() == 'true':
     allowed_origins = ["*"]
 
+# Added before CORS so CORS stays outermost and also decorates 304s
+app.add_middleware(WorkerSyncMiddleware)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Inside metrics, so rejected requests are still counted and timed
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -30,18 +89,25 @@ app.add_middleware(
 
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", ContentAddressedStaticFiles(directory="uploads"), name="uploads")
 
 # Include routers
 app.include_router(users.router)
 app.include_router(products.router)
 app.include_router(orders.router)
 app.include_router(admin.router)
+app.include_router(exports.router)
 
 # Additional endpoints
 @app.get("/api/categories")
 async def get_categories():
-    conn = get_db()
+    body = catalog_cache.get(CATEGORIES_KEY)
+    if body is None:
+        body = await run_db(catalog_cache.load_json, CATEGORIES_KEY, _get_categories)
+    return Response(content=body, media_type="application/json")
+
+def _get_categories():
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
@@ -55,6 +121,15 @@ async def get_categories():
         cursor.close()
         conn.close()
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    for pool in (db_pool, replica_pool):
+        if pool is not None:
+            stats = pool.stats()
+            db_pool_open.set(stats["open"], pool=pool.name)
+            db_pool_waiting.set(stats["waiting"], pool=pool.name)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     return {"status": "API is running"}
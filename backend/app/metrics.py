@@ -0,0 +1,268 @@
+import os
+import re
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 1000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_items(self, items):
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_items(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+REGISTRY = []
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests currently being handled")
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "Database statements executed per HTTP request", ("route",), COUNT_BUCKETS
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("statement", "table")
+)
+db_query_rows = Histogram(
+    "db_query_rows", "Rows fetched per database statement", ("statement", "table"), ROW_BUCKETS
+)
+db_pool_wait = Histogram("db_pool_wait_seconds", "Time spent checking a connection out of the pool", ("pool",))
+db_pool_in_use = Gauge("db_pool_connections_in_use", "Pooled connections currently checked out", ("pool",))
+db_pool_open = Gauge("db_pool_connections_open", "Connections opened by the pool", ("pool",))
+db_pool_waiting = Gauge("db_pool_waiting", "Requests queued for a connection", ("pool",))
+db_pool_errors = Counter("db_pool_checkout_errors_total", "Failed connection checkouts", ("pool", "reason"))
+http_requests_rejected = Counter(
+    "http_requests_rejected_total", "Requests turned away by rate limiting or load shedding", ("reason", "route_class")
+)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "bcrypt time per operation", ("operation",)
+)
+
+# Per-request statement counter; run_db copies the context, so DB threads see the request's
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+def start_request():
+    stats = {"queries": 0}
+    _request_stats.set(stats)
+    return stats
+
+_STATEMENT = re.compile(r"^\s*(\w+)", re.IGNORECASE)
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+def describe_statement(operation: str):
+    """(verb, first table) for a SQL statement, used as low-cardinality labels."""
+    verb = _STATEMENT.match(operation or "")
+    table = _TABLE.search(operation or "")
+    return (verb.group(1).upper() if verb else "OTHER"), (table.group(1).lower() if table else "")
+
+def record_query(operation: str, seconds: float, statement: str, table: str):
+    db_query_duration.observe(seconds, statement=statement, table=table)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats["queries"] += 1
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        print(f"Slow query ({seconds * 1000:.1f} ms): {' '.join(operation.split())[:500]}")
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and counts the rows fetched for each."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._labels = None
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._rows += 1
+            yield row
+
+    def _finish_statement(self):
+        if self._labels is not None:
+            statement, table = self._labels
+            db_query_rows.observe(self._rows, statement=statement, table=table)
+            self._labels = None
+        self._rows = 0
+
+    def _timed(self, method, operation, *args, **kwargs):
+        self._finish_statement()
+        self._labels = describe_statement(operation)
+        started = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started, *self._labels)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.executemany, operation, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self._finish_statement()
+        return self._cursor.close()
+
+class InstrumentedConnection:
+    """Connection proxy that hands out instrumented cursors and tracks pool occupancy."""
+
+    def __init__(self, conn, pool=None):
+        self._conn = conn
+        self._pool = pool
+        self._closed = False
+        if pool:
+            db_pool_in_use.inc(pool=pool)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._pool and not self._closed:
+            db_pool_in_use.dec(pool=self._pool)
+        self._closed = True
+        return self._conn.close()
+
+class MetricsMiddleware:
+    """Records latency and DB statement count per route template, and logs slow requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        stats = start_request()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(elapsed, method=scope["method"], route=route, status=status)
+            db_queries_per_request.observe(stats["queries"], route=route)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                print(f"Slow request ({elapsed * 1000:.1f} ms, {stats['queries']} queries): {scope['method']} {scope['path']}")
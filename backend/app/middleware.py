@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import os
+import re
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from .auth import verify_token
+from .versions import table_versions
+from .workers import sync_workers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 5))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# path pattern -> (tables the response is built from, role the endpoint requires: None, "user" or "admin")
+VERSIONED_ROUTES = [
+    (re.compile(r"^/api/products$"), ("products", "product_images"), None),
+    (re.compile(r"^/api/products/search$"), ("products", "product_images"), None),
+    (re.compile(r"^/api/products/\d+/images$"), ("product_images",), None),
+    (re.compile(r"^/api/categories$"), ("categories",), None),
+    (re.compile(r"^/api/(admin|orders/admin)/orders$"), ("orders", "order_items", "users", "products"), "admin"),
+    (re.compile(r"^/api/orders/user/\d+$"), ("orders", "order_items", "products"), "user"),
+    (re.compile(r"^/api/admin/customers$"), ("users", "orders"), "admin"),
+]
+
+def _versioned_route(path):
+    for pattern, tables, role in VERSIONED_ROUTES:
+        if pattern.match(path):
+            return tables, role
+    return None, None
+
+async def _verified_user(authorization, role):
+    """The verified "<role>:<user id>" behind a bearer token allowed on the route, or None.
+
+    Uses the same check as the route's dependency (auth.verify_token, which
+    also consults the revocation list); anything it rejects is left to the
+    handler to answer.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    try:
+        payload = await verify_token(HTTPAuthorizationCredentials(scheme=scheme, credentials=token.strip()))
+    except HTTPException:
+        return None
+    if role == "admin" and payload.get("role") != "admin":
+        return None
+    return f"{payload.get('role', 'user')}:{payload.get('sub')}"
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+class ETagMiddleware:
+    """Weak ETags from table version counters, with 304s that skip the handler.
+
+    The tag covers the path, the query string and, on endpoints that require a
+    token, the verified user, so a client can only revalidate a response it was
+    previously allowed to receive. The token is checked here with the route's
+    own rules before answering 304; requests it does not pass go to the handler,
+    which gives the 401 or 403. Versions are read before the handler runs: a
+    write racing the request leaves the response with an older tag, which just
+    forces a refetch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        tables, role = _versioned_route(scope["path"])
+        if tables is None:
+            return await self.app(scope, receive, send)
+        
+        user = ""
+        if role is not None:
+            user = await _verified_user(_header(scope, b"authorization"), role)
+            if user is None:
+                return await self.app(scope, receive, send)
+        variant = hashlib.sha256(scope["path"].encode() + b"?" + scope["query_string"] + b"|" + user.encode()).hexdigest()[:16]
+        etag = f'W/"{table_versions.token(tables)}-{variant}"'
+        cache_control = "private, no-cache" if user else "no-cache"
+        headers = [(b"etag", etag.encode()), (b"cache-control", cache_control.encode())]
+        
+        if_none_match = _header(scope, b"if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = list(message.get("headers", []))
+                if not any(key == b"etag" for key, _ in response_headers):
+                    response_headers.extend(headers)
+                message = {**message, "headers": response_headers}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_etag)
+
+class CompressionMiddleware:
+    """Brotli/gzip for JSON and text bodies of at least COMPRESSION_MIN_SIZE bytes.
+
+    Only single-chunk bodies are compressed; streamed responses (exports, files)
+    pass through untouched so they keep flowing without being buffered.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        accepted = _header(scope, b"accept-encoding") or ""
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            return await self.app(scope, receive, send)
+        
+        start = None
+        
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            pending, start = start, None
+            headers = list(pending.get("headers", []))
+            content_type = next((value.decode("latin-1") for key, value in headers if key == b"content-type"), "")
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or any(key == b"content-encoding" for key, _ in headers)
+            ):
+                await send(pending)
+                await send(message)
+                return
+            
+            if encoding == "br":
+                body = brotli.compress(body, quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            headers = [(key, value) for key, value in headers if key != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": body})
+        
+        await self.app(scope, receive, send_compressed)
+
+class WorkerSyncMiddleware:
+    """Applies the cache/search/revocation changes other worker processes announced before each request.
+
+    A no-op when running a single worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            sync_workers()
+        await self.app(scope, receive, send)
@@ -30,10 +30,10 @@ class OrderItem(BaseModel):
     quantity: int
 
 class CreateOrder(BaseModel):
+    # The total is computed from current product prices and new orders start as pending;
+    # total_amount or status sent by older clients are ignored
     user_id: int
     items: List[OrderItem]
-    total_amount: float
-    status: str = "pending"
 
 class UpdateOrderStatus(BaseModel):
     status: str
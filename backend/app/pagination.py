@@ -0,0 +1,30 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from fastapi import HTTPException
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque keyset cursor."""
+    if isinstance(value, Decimal):
+        value = str(value)
+    elif hasattr(value, "isoformat"):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str):
+    """Return (value, last_id) from a cursor produced by encode_cursor for the same sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data["s"] != sort:
+            raise ValueError("cursor was issued for a different sort order")
+        return data["v"], int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+
+def decimal_value(value) -> Decimal:
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise HTTPException(status_code=400, detail="Invalid cursor: bad numeric value")
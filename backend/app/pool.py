@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import deque
+import mysql.connector
+from mysql.connector import Error
+
+class PoolTimeout(Exception):
+    """No connection became free before the checkout deadline."""
+
+class _Waiter:
+    __slots__ = ("event", "conn", "slot")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+        self.slot = False  # allowed to open a new connection in place of a discarded one
+
+class PooledConnection:
+    """Checked-out connection; close() returns it to the pool instead of closing the socket."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._dirty = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def mark_dirty(self):
+        """The session state was changed (SET SESSION, user variables, temp tables); reset it on release."""
+        self._dirty = True
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn, reset=self._dirty)
+
+class ConnectionPool:
+    """Fixed-size MySQL connection pool with FIFO waiters and background validation.
+
+    Connections are opened on demand up to `size`. When all are checked out,
+    callers queue in arrival order and each gets a released connection handed
+    to it directly, or PoolTimeout after `timeout` seconds. Sessions are set up
+    once (autocommit off) and are only reset on release if the borrower marked
+    them dirty; an open transaction is rolled back instead, which is cheaper.
+    Idle connections are pinged by a background thread every
+    `validate_interval` seconds and dropped if the server has gone away.
+    """
+
+    def __init__(self, name: str, config: dict, size: int, timeout: float, validate_interval: float):
+        self.name = name
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.validate_interval = validate_interval
+        self._lock = threading.Lock()
+        self._idle = deque()  # (connection, released_at), most recently used on the right
+        self._waiters = deque()
+        self._open = 0
+        self._validator = None
+
+    def get_connection(self, timeout: float = None) -> PooledConnection:
+        return PooledConnection(self, self.acquire(timeout))
+
+    def acquire(self, timeout: float = None):
+        self._start_validator()
+        waiter = None
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()[0]
+            if self._open < self.size:
+                self._open += 1
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+        
+        if waiter is not None:
+            waiter.event.wait(self.timeout if timeout is None else timeout)
+            # Hand-offs happen under the lock, so a waiter that timed out is either still queued or was served
+            with self._lock:
+                if waiter.conn is not None:
+                    return waiter.conn
+                if not waiter.slot:
+                    self._waiters.remove(waiter)
+                    raise PoolTimeout(f"No {self.name} database connection available")
+        
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+
+    def release(self, conn, reset: bool = False):
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            if reset:
+                conn.reset_session()
+                conn.autocommit = False
+            elif conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._discard(conn)
+            return
+        self._hand_back(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "open": self._open, "idle": len(self._idle), "waiting": len(self._waiters)}
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        conn.autocommit = False
+        return conn
+
+    def _hand_back(self, conn):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.conn = conn
+                waiter.event.set()
+            else:
+                self._idle.append((conn, time.monotonic()))
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Error:
+            pass
+        # Let the first waiter open a replacement instead of waiting for a release that will not come
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.slot = True
+                waiter.event.set()
+            else:
+                self._open -= 1
+
+    def _start_validator(self):
+        if self._validator is not None or self.validate_interval <= 0:
+            return
+        with self._lock:
+            if self._validator is not None:
+                return
+            self._validator = threading.Thread(target=self._validate_loop, name=f"{self.name}-pool-validator", daemon=True)
+        self._validator.start()
+
+    def _validate_loop(self):
+        while True:
+            time.sleep(self.validate_interval)
+            cutoff = time.monotonic() - self.validate_interval
+            with self._lock:
+                stale = [entry for entry in self._idle if entry[1] <= cutoff]
+                for entry in stale:
+                    self._idle.remove(entry)
+            for conn, _ in stale:
+                try:
+                    conn.ping(reconnect=False)
+                except Error:
+                    print(f"Dropping dead {self.name} database connection")
+                    self._discard(conn)
+                    continue
+                self._hand_back(conn)
@@ -0,0 +1,147 @@
+import os
+import re
+import math
+import time
+import hashlib
+from collections import OrderedDict
+from .auth import token_cache
+from .database import POOL_SIZE, REPLICA_POOL_SIZE
+from .metrics import http_requests_rejected
+
+def _parse_rate(value: str):
+    """'120/10' -> (burst 120, refill 12 tokens per second); '0' or 'off' disables the class."""
+    if value.strip().lower() in ("0", "off", "false"):
+        return None
+    requests, _, seconds = value.partition("/")
+    return int(requests), int(requests) / float(seconds or 1)
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# Per client and route class: "<requests>/<seconds>", refilled continuously
+RATE_LIMITS = {
+    "auth": _parse_rate(os.getenv('RATE_LIMIT_AUTH', '10/60')),
+    "checkout": _parse_rate(os.getenv('RATE_LIMIT_CHECKOUT', '10/60')),
+    "write": _parse_rate(os.getenv('RATE_LIMIT_WRITE', '30/10')),
+    "read": _parse_rate(os.getenv('RATE_LIMIT_READ', '120/10')),
+}
+# Clients tracked at once; the least recently seen are forgotten (their buckets start full again)
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 100000))
+# Requests handled at once before new ones get a 503. Past the pool size they would only queue
+# for a connection, so the default leaves room for cache hits and 304s but not much more; 0 disables
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 2 * (POOL_SIZE + REPLICA_POOL_SIZE)))
+
+# (methods, path pattern, route class); the first match wins, paths outside /api are never limited
+ROUTE_CLASSES = [
+    (("POST",), re.compile(r"^/api/(auth/login|auth/register|admin/login)$"), "auth"),
+    (("POST",), re.compile(r"^/api/orders$"), "checkout"),
+    (("GET", "HEAD"), re.compile(r"^/api/"), "read"),
+    (("POST", "PUT", "PATCH", "DELETE"), re.compile(r"^/api/"), "write"),
+]
+# Streamed exports use their own unpooled connection, so they do not count towards the limit
+UNGATED_PATHS = re.compile(r"^/api/admin/export/")
+
+def route_class(method: str, path: str):
+    for methods, pattern, name in ROUTE_CLASSES:
+        if method in methods and pattern.match(path):
+            return name
+    return None
+
+class TokenBuckets:
+    """Token buckets keyed by (route class, client), kept in an LRU of bounded size.
+
+    Only used from the event loop, so there is no lock. Each worker process
+    has its own buckets.
+    """
+
+    def __init__(self, limits: dict, max_clients: int):
+        self.limits = limits
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # (route class, client) -> [tokens, updated_at]
+
+    def take(self, name: str, client: str) -> float:
+        """Take one token; returns 0 if allowed, else the seconds until one is available."""
+        limit = self.limits.get(name)
+        if limit is None:
+            return 0
+        burst, rate = limit
+        now = time.monotonic()
+        key = (name, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / rate
+
+def _client_key(scope) -> str:
+    """The verified user behind a bearer token, or else the client address.
+
+    Only tokens already verified (and cached) by auth.verify_token count, so
+    made-up tokens cannot buy a fresh bucket; a user's first request after
+    logging in is counted against their address.
+    """
+    for key, value in scope["headers"]:
+        if key == b"authorization" and value[:7].lower() == b"bearer ":
+            payload = token_cache.peek(hashlib.sha256(value[7:].strip()).digest())
+            if payload is not None and payload.get("exp", 0) > time.time():
+                return f"{payload.get('role', 'user')}:{payload.get('sub')}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+async def _reject(send, status: int, detail: str, retry_after: float):
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class LoadSheddingMiddleware:
+    """Per-client rate limits by route class plus a cap on requests in flight.
+
+    Both fail fast, 429 or 503 with Retry-After, instead of letting an
+    overload queue on the connection pool until requests time out. Limits are
+    per worker process: with serve.py a client may get up to one allowance
+    per worker its connections land on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = TokenBuckets(RATE_LIMITS, RATE_LIMIT_MAX_CLIENTS)
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+        
+        if RATE_LIMIT_ENABLED:
+            wait = self.buckets.take(name, _client_key(scope))
+            if wait:
+                http_requests_rejected.inc(reason="rate_limit", route_class=name)
+                return await _reject(send, 429, "Too many requests, please slow down", wait)
+        
+        if not MAX_CONCURRENT_REQUESTS or UNGATED_PATHS.match(scope["path"]):
+            return await self.app(scope, receive, send)
+        if self.in_flight >= MAX_CONCURRENT_REQUESTS:
+            http_requests_rejected.inc(reason="overload", route_class=name)
+            return await _reject(send, 503, "Server busy, please retry", 1)
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
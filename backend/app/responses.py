@@ -0,0 +1,54 @@
+import json
+import enum
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    """Encode what the JSON backend cannot, the way FastAPI's jsonable_encoder does."""
+    if isinstance(value, Decimal):
+        # Whole numbers stay integers, like pydantic's decimal encoder
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+def dumps(data: Any) -> bytes:
+    """Serialize a handler result (e.g. mysql.connector dict rows) to compact UTF-8 JSON.
+
+    Uses orjson when installed and the stdlib otherwise; both call _default
+    only for the values they cannot encode natively, instead of walking the
+    whole structure up front as jsonable_encoder does.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(); the app's default response class.
+
+    FastAPI still runs jsonable_encoder over plain return values before
+    rendering, so endpoints returning large lists return this response
+    directly to skip that pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
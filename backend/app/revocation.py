@@ -0,0 +1,77 @@
+import threading
+from abc import ABC, abstractmethod
+from .workers import publish, subscribe
+
+class RevocationList(ABC):
+    """Decides whether an otherwise valid token must be rejected.
+
+    Revocation is per subject (role + id), so it covers every token the
+    subject holds, including ones issued after the revocation. Implementations
+    are consulted on every authenticated request and must not hit the database.
+    """
+
+    @abstractmethod
+    def is_revoked(self, payload: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def revoke(self, role: str, subject_id) -> None:
+        ...
+
+    @abstractmethod
+    def restore(self, role: str, subject_id) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, role: str, subject_ids) -> None:
+        """Replace the revoked subjects for a role, e.g. from the database at startup."""
+
+class InMemoryRevocationList(RevocationList):
+    """Revoked subjects held in process memory; changes are announced to the other worker processes."""
+
+    def __init__(self):
+        self._revoked = set()
+        self._lock = threading.Lock()
+
+    def is_revoked(self, payload: dict) -> bool:
+        return (payload.get("role"), str(payload.get("sub"))) in self._revoked
+
+    def revoke(self, role: str, subject_id) -> None:
+        self.apply("revoke", role, subject_id)
+        publish("revocation.revoke", f"{role}:{subject_id}")
+
+    def restore(self, role: str, subject_id) -> None:
+        self.apply("restore", role, subject_id)
+        publish("revocation.restore", f"{role}:{subject_id}")
+
+    def apply(self, change: str, role: str, subject_id) -> None:
+        """Record a revoke/restore locally without announcing it."""
+        with self._lock:
+            if change == "revoke":
+                self._revoked.add((role, str(subject_id)))
+            else:
+                self._revoked.discard((role, str(subject_id)))
+
+    def load(self, role: str, subject_ids) -> None:
+        with self._lock:
+            self._revoked = {entry for entry in self._revoked if entry[0] != role}
+            self._revoked.update((role, str(subject_id)) for subject_id in subject_ids)
+
+revocation_list: RevocationList = InMemoryRevocationList()
+
+def set_revocation_list(implementation: RevocationList):
+    global revocation_list
+    revocation_list = implementation
+
+def get_revocation_list() -> RevocationList:
+    return revocation_list
+
+def _apply_remote(change: str):
+    def handler(payload):
+        if isinstance(revocation_list, InMemoryRevocationList):
+            role, subject_id = payload.split(":", 1)
+            revocation_list.apply(change, role, subject_id)
+    return handler
+
+subscribe("revocation.revoke", _apply_remote("revoke"))
+subscribe("revocation.restore", _apply_remote("restore"))
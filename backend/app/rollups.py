@@ -0,0 +1,37 @@
+from .stats import COUNTED_ORDER_STATUSES
+
+# sales_daily holds one row per day; sales_daily_products one row per day and product.
+# An order contributes to both while its status is one of COUNTED_ORDER_STATUSES,
+# keyed by the day it was placed, and likewise to its customer's users.lifetime_spend.
+
+def apply_order_to_rollups(cursor, order_id: int, sign: int):
+    """Add (sign=1) or remove (sign=-1) an order's contribution to the sales rollups and customer spend.
+
+    Must run inside the transaction that changes the order's status.
+    """
+    cursor.execute(
+        "INSERT INTO sales_daily (day, orders, revenue) "
+        "SELECT DATE(created_at), %s, %s * total_amount FROM orders WHERE id = %s "
+        "ON DUPLICATE KEY UPDATE orders = orders + VALUES(orders), revenue = revenue + VALUES(revenue)",
+        (sign, sign, order_id)
+    )
+    cursor.execute(
+        "INSERT INTO sales_daily_products (day, product_id, category_id, orders, units, revenue) "
+        "SELECT DATE(o.created_at), oi.product_id, p.category_id, %s, %s * SUM(oi.quantity), %s * SUM(oi.quantity * oi.price) "
+        "FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN products p ON p.id = oi.product_id "
+        "WHERE o.id = %s GROUP BY DATE(o.created_at), oi.product_id, p.category_id "
+        "ON DUPLICATE KEY UPDATE orders = orders + VALUES(orders), units = units + VALUES(units), revenue = revenue + VALUES(revenue)",
+        (sign, sign, sign, order_id)
+    )
+    # updated_at is kept: it tracks profile changes, not orders
+    cursor.execute(
+        "UPDATE users u JOIN orders o ON o.user_id = u.id "
+        "SET u.lifetime_spend = u.lifetime_spend + %s * o.total_amount, u.updated_at = u.updated_at WHERE o.id = %s",
+        (sign, order_id)
+    )
+
+def order_status_rollup_sign(old_status, new_status) -> int:
+    """+1 if the order starts counting towards sales, -1 if it stops, else 0."""
+    was_counted = old_status in COUNTED_ORDER_STATUSES
+    is_counted = new_status in COUNTED_ORDER_STATUSES
+    return int(is_counted) - int(was_counted)
@@ -1,12 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
-from ..database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+import re
+from ..database import get_db, run_db
+from ..cache import catalog_cache
+from ..responses import FastJSONResponse
 from ..models import AdminLogin
-from ..auth import hash_password, verify_password, create_token, verify_token
+from ..auth import hash_password_async, verify_password_async, password_needs_rehash, create_token, verify_token, token_cache
 from ..dependencies import require_admin
+from ..pagination import encode_cursor, decode_cursor, decimal_value
+from ..revocation import get_revocation_list
+from ..versions import table_versions
+from ..inventory import inventory_engine
+from ..logwriter import log_writer
+from ..stats import dashboard_stats
+from . import orders
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# The admin panel addresses order management under /api/admin
+router.add_api_route("/orders", orders.get_admin_orders, methods=["GET"])
+router.add_api_route("/orders/{order_id}", orders.update_order_status, methods=["PUT"])
+
 @router.options("/login")
 async def admin_login_options():
     from starlette.responses import Response
@@ -20,21 +35,28 @@ async def admin_login_options():
 @router.post("/login")
 async def admin_login(admin: AdminLogin):
     print(f"Admin login attempt for: {admin.email}")
+    db_admin = await run_db(_get_login_admin, admin.email)
+    
+    if not db_admin or not await verify_password_async(admin.password, db_admin['password']):
+        raise HTTPException(status_code=401, detail="Invalid admin credentials")
+    
+    if password_needs_rehash(db_admin['password']):
+        try:
+            await run_db(_update_admin_password, db_admin['id'], await hash_password_async(admin.password))
+        except Exception as e:
+            print(f"Password rehash failed for admin {db_admin['id']}: {str(e)}")
+    
+    token = create_token({"sub": str(db_admin['id']), "role": db_admin['role']})
+    
+    return {"token": token, "message": "Admin login successful"}
+
+def _get_login_admin(email: str):
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id, email, password, role FROM admins WHERE email = %s", (admin.email,))
-        db_admin = cursor.fetchone()
-        
-        if not db_admin or not verify_password(admin.password, db_admin['password']):
-            raise HTTPException(status_code=401, detail="Invalid admin credentials")
-        
-        token = create_token({"sub": str(db_admin['id']), "role": db_admin['role']})
-        
-        return {"token": token, "message": "Admin login successful"}
-    except HTTPException:
-        raise
+        cursor.execute("SELECT id, email, password, role FROM admins WHERE email = %s", (email,))
+        return cursor.fetchone()
     except Exception as e:
         print(f"Database error in admin login: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -42,62 +64,124 @@ async def admin_login(admin: AdminLogin):
         cursor.close()
         conn.close()
 
-@router.get("/stats/users")
-async def get_users_stats(payload=Depends(require_admin)):
+def _update_admin_password(admin_id: int, hashed_pwd: str):
     conn = get_db()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT COUNT(*) as count FROM users")
-        result = cursor.fetchone()
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        cursor.execute("UPDATE admins SET password = %s WHERE id = %s", (hashed_pwd, admin_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
 
+@router.get("/stats")
+async def get_stats(payload=Depends(require_admin)):
+    return dashboard_stats.snapshot()
+
+@router.get("/stats/users")
+async def get_users_stats(payload=Depends(require_admin)):
+    return {"count": dashboard_stats.snapshot()["users"]}
+
 @router.get("/stats/products")
 async def get_products_stats(payload=Depends(require_admin)):
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("SELECT COUNT(*) as count FROM products")
-        result = cursor.fetchone()
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    return {"count": dashboard_stats.snapshot()["products"]}
 
 @router.get("/stats/orders")
 async def get_orders_stats(payload=Depends(require_admin)):
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("SELECT COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total_sales FROM orders WHERE status IN ('confirmed', 'shipped', 'delivered')")
-        result = cursor.fetchone()
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
+    stats = dashboard_stats.snapshot()
+    return {"count": stats["orders"], "total_sales": stats["total_sales"]}
+
+@router.get("/cache/stats")
+async def get_cache_stats(payload=Depends(require_admin)):
+    stats = {"catalog": catalog_cache.stats(), "tokens": token_cache.stats()}
+    stats["log_writer"] = log_writer.stats()
+    if inventory_engine is not None:
+        stats["inventory"] = inventory_engine.stats()
+    return stats
+
+CUSTOMER_SORTS = {
+    # sort name: (column, direction)
+    "newest": ("u.id", "DESC"),
+    "name": ("u.name", "ASC"),
+    "order_count": ("u.order_count", "DESC"),
+    "lifetime_spend": ("u.lifetime_spend", "DESC"),
+}
 
 @router.get("/customers")
-async def get_customers(payload=Depends(require_admin)):
-    conn = get_db()
+async def get_customers(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=255),
+    status: Optional[Literal["active", "inactive", "blocked"]] = None,
+    sort: Literal["newest", "name", "order_count", "lifetime_spend"] = "newest",
+    payload=Depends(require_admin),
+):
+    return FastJSONResponse(await run_db(_get_customers, limit, cursor, q, status, sort))
+
+def _customer_search(q: str):
+    """Prefix search on the indexed column the query looks like: email, phone, or name/email."""
+    q = q.strip()
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    if "@" in q:
+        return "u.email LIKE %s", [pattern]
+    # Phones are stored as entered, so the prefix is matched as typed
+    if re.fullmatch(r"[\d\s()+-]+", q) and any(c.isdigit() for c in q):
+        return "u.phone LIKE %s", [pattern]
+    return "(u.name LIKE %s OR u.email LIKE %s)", [pattern, pattern]
+
+def _get_customers(limit: int, page_cursor: Optional[str], q: Optional[str], status: Optional[str], sort: str):
+    # order_count and lifetime_spend are maintained columns, so no orders are read here
+    column, direction = CUSTOMER_SORTS[sort]
+    conditions = []
+    params = []
+    
+    if q and q.strip():
+        condition, values = _customer_search(q)
+        conditions.append(condition)
+        params.extend(values)
+    if status:
+        conditions.append("u.status = %s")
+        params.append(status)
+    
+    if page_cursor:
+        value, last_id = decode_cursor(page_cursor, sort)
+        op = "<" if direction == "DESC" else ">"
+        if column == "u.id":
+            conditions.append(f"u.id {op} %s")
+            params.append(last_id)
+        else:
+            if column == "u.lifetime_spend":
+                value = decimal_value(value)
+            conditions.append(f"({column} {op} %s OR ({column} = %s AND u.id {op} %s))")
+            params.extend([value, value, last_id])
+    
+    query = (
+        "SELECT u.id, u.name, u.email, u.phone, u.status, u.order_count, u.lifetime_spend, u.created_at "
+        f"FROM users u WHERE {' AND '.join(conditions) or '1 = 1'} "
+        f"ORDER BY {column} {direction}" + (f", u.id {direction}" if column != "u.id" else "") +
+        " LIMIT %s"
+    )
+    params.append(limit + 1)
+    
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute(
-            "SELECT u.id, u.name, u.email, u.phone, COUNT(o.id) as order_count FROM users u LEFT JOIN orders o ON u.id = o.user_id GROUP BY u.id, u.name, u.email, u.phone"
-        )
+        cursor.execute(query, tuple(params))
         customers = cursor.fetchall()
-        return {"customers": customers}
+        
+        next_cursor = None
+        if len(customers) > limit:
+            customers = customers[:limit]
+            last = customers[-1]
+            next_cursor = encode_cursor(sort, last[column[2:]], last["id"])
+        return {"customers": customers, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -106,19 +190,23 @@ async def get_customers(payload=Depends(require_admin)):
 
 @router.put("/customers/{customer_id}")
 async def deactivate_customer(customer_id: int, update: dict, payload=Depends(require_admin)):
+    admin_id = int(payload.get("sub"))
+    return await run_db(_deactivate_customer, customer_id, update, admin_id)
+
+def _deactivate_customer(customer_id: int, update: dict, admin_id: int):
     conn = get_db()
     cursor = conn.cursor()
-    admin_id = int(payload.get("sub"))
     
     try:
         cursor.execute("UPDATE users SET status = %s WHERE id = %s", (update.get("status"), customer_id))
-        
-        cursor.execute(
-            "INSERT INTO activity_logs (admin_id, action, details) VALUES (%s, %s, %s)",
-            (admin_id, f"Customer {customer_id} deactivated", f"Status: {update.get('status')}")
-        )
-        
         conn.commit()
+        log_writer.write("activity_logs", (admin_id, f"Customer {customer_id} deactivated", f"Status: {update.get('status')}"), conn=conn)
+        table_versions.bump("users")
+        
+        if update.get("status") == "active":
+            get_revocation_list().restore("user", customer_id)
+        else:
+            get_revocation_list().revoke("user", customer_id)
         return {"message": "Customer updated"}
     except Exception as e:
         conn.rollback()
@@ -127,49 +215,84 @@ async def deactivate_customer(customer_id: int, update: dict, payload=Depends(re
         cursor.close()
         conn.close()
 
+REPORT_GROUPINGS = {
+    # group_by: (extra select columns, joins, extra group-by columns)
+    "category": (
+        "s.category_id, c.name as category, SUM(s.units) as units, COALESCE(SUM(s.revenue), 0) as revenue",
+        "FROM sales_daily_products s LEFT JOIN categories c ON c.id = s.category_id",
+        ", s.category_id, c.name",
+    ),
+    "product": (
+        "s.product_id, p.name as product_name, SUM(s.orders) as orders, SUM(s.units) as units, COALESCE(SUM(s.revenue), 0) as revenue",
+        "FROM sales_daily_products s LEFT JOIN products p ON p.id = s.product_id",
+        ", s.product_id, p.name",
+    ),
+}
+
 @router.get("/reports")
-async def get_reports(period: str = "daily", payload=Depends(require_admin)):
-    conn = get_db()
+async def get_reports(
+    period: str = "daily",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: Optional[Literal["category", "product"]] = None,
+    payload=Depends(require_admin),
+):
+    today = date.today()
+    if date_to is None:
+        date_to = today
+    if date_from is None:
+        if period == "monthly":
+            date_from = (date_to.replace(day=1) - timedelta(days=335)).replace(day=1)
+        else:
+            date_from = date_to - timedelta(days=7)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    return FastJSONResponse(await run_db(_get_reports, period, date_from, date_to, group_by))
+
+def _get_reports(period: str, date_from: date, date_to: date, group_by: Optional[str]):
+    # Served from the sales_daily rollups, so the cost depends on the number of days, not orders
+    bucket = "DATE_FORMAT(s.day, '%%Y-%%m-01')" if period == "monthly" else "s.day"
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
-        if period == "monthly":
-            query = """
-                SELECT DATE_FORMAT(created_at, '%Y-%m-01') as date, 
-                       COUNT(*) as orders, 
-                       COALESCE(SUM(total_amount), 0) as revenue 
-                FROM orders 
-                WHERE status IN ('confirmed', 'shipped', 'delivered')
-                AND created_at >= DATE_SUB(NOW(), INTERVAL 12 MONTH)
-                GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-                ORDER BY date DESC
+        if group_by:
+            columns, source, grouping = REPORT_GROUPINGS[group_by]
+            query = f"""
+                SELECT {bucket} as date, {columns}
+                {source}
+                WHERE s.day BETWEEN %s AND %s
+                GROUP BY {bucket}{grouping}
+                ORDER BY date DESC, revenue DESC
             """
-        else:  # daily
-            query = """
-                SELECT DATE(created_at) as date, 
-                       COUNT(*) as orders, 
-                       COALESCE(SUM(total_amount), 0) as revenue 
-                FROM orders 
-                WHERE status IN ('confirmed', 'shipped', 'delivered')
-                AND created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-                GROUP BY DATE(created_at)
+        else:
+            query = f"""
+                SELECT {bucket} as date, SUM(s.orders) as orders, COALESCE(SUM(s.revenue), 0) as revenue
+                FROM sales_daily s
+                WHERE s.day BETWEEN %s AND %s
+                GROUP BY {bucket}
                 ORDER BY date DESC
             """
         
-        cursor.execute(query)
+        cursor.execute(query, (date_from, date_to))
         report_data = cursor.fetchall()
         
-        total_orders = sum(r['orders'] for r in report_data)
-        total_revenue = sum(float(r['revenue']) for r in report_data)
+        cursor.execute(
+            "SELECT COALESCE(SUM(orders), 0) as total_orders, COALESCE(SUM(revenue), 0) as total_revenue FROM sales_daily WHERE day BETWEEN %s AND %s",
+            (date_from, date_to)
+        )
+        totals = cursor.fetchone()
         
         return {
             "report_data": report_data,
-            "total_orders": total_orders,
-            "total_revenue": total_revenue
+            "total_orders": int(totals['total_orders']),
+            "total_revenue": float(totals['total_revenue']),
+            "date_from": date_from,
+            "date_to": date_to
         }
     except Exception as e:
         print(f"Report error: {str(e)}")
-        return {"report_data": [], "total_orders": 0, "total_revenue": 0}
+        raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
         conn.close()
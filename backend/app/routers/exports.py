@@ -0,0 +1,154 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from datetime import date, timedelta
+from typing import Literal, Optional
+import csv
+import io
+import os
+from ..database import connect_unpooled, run_db
+from ..dependencies import require_admin
+from ..responses import dumps
+
+router = APIRouter(prefix="/api/admin/export", tags=["admin"])
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+# Each export holds its own connection for its whole duration
+EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', 2))
+_exports_running = 0
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_QUERIES = {
+    "orders": (
+        "SELECT o.id, o.user_id, u.name as customer_name, u.email as customer_email, u.phone as customer_phone, "
+        "o.total_amount, o.status, o.payment_method, o.delivery_address, o.created_at, o.updated_at "
+        "FROM orders o JOIN users u ON u.id = o.user_id",
+        "o.created_at", "o.id",
+    ),
+    "order_items": (
+        "SELECT oi.id, oi.order_id, oi.product_id, p.name as product_name, oi.quantity, oi.price, "
+        "o.status as order_status, o.created_at as order_created_at "
+        "FROM order_items oi JOIN orders o ON o.id = oi.order_id LEFT JOIN products p ON p.id = oi.product_id",
+        "o.created_at", "oi.id",
+    ),
+    "customers": (
+        "SELECT id, name, email, phone, status, order_count, lifetime_spend, created_at FROM users",
+        "created_at", "id",
+    ),
+    "inventory_logs": (
+        "SELECT id, product_id, old_stock, new_stock, action, admin_id, created_at FROM inventory_logs",
+        "created_at", "id",
+    ),
+}
+
+def _open_export(query: str, params: tuple):
+    conn = connect_unpooled(readonly=True)
+    try:
+        # Unbuffered: rows stay on the server until fetched, so memory use is one batch
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(query, params)
+        return conn, cursor
+    except Exception as e:
+        conn.shutdown()
+        raise HTTPException(status_code=500, detail=str(e))
+
+class ExportResponse(StreamingResponse):
+    """Streams an export and gives back its slot however the response ends.
+
+    The slot is taken by the handler; releasing it here rather than in the
+    generator also covers clients that disconnect before the body starts.
+    """
+
+    async def __call__(self, scope, receive, send):
+        global _exports_running
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _exports_running -= 1
+
+async def _stream_export(query: str, params: tuple, fmt: str):
+    conn, cursor = await run_db(_open_export, query, params)
+    try:
+        columns = list(cursor.column_names)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        
+        while True:
+            rows = await run_db(cursor.fetchmany, EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    finally:
+        # Drops the connection without draining rows the client never read
+        await run_db(conn.shutdown)
+
+async def _export(name: str, fmt: str, date_from: Optional[date], date_to: Optional[date]):
+    global _exports_running
+    if _exports_running >= EXPORT_MAX_CONCURRENT:
+        raise HTTPException(status_code=503, detail="Too many exports in progress", headers={"Retry-After": "30"})
+    
+    base, date_column, order_column = EXPORT_QUERIES[name]
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append(f"{date_column} >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append(f"{date_column} < %s")
+        params.append(date_to + timedelta(days=1))
+    query = base + (f" WHERE {' AND '.join(conditions)}" if conditions else "") + f" ORDER BY {order_column}"
+    
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"{name}.{fmt}"
+    # Checked and taken without awaiting in between; ExportResponse releases it
+    _exports_running += 1
+    return ExportResponse(
+        _stream_export(query, tuple(params), fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/orders")
+async def export_orders(
+    fmt: ExportFormat = Query("csv", alias="format"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payload=Depends(require_admin),
+):
+    return await _export("orders", fmt, date_from, date_to)
+
+@router.get("/order-items")
+async def export_order_items(
+    fmt: ExportFormat = Query("csv", alias="format"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payload=Depends(require_admin),
+):
+    return await _export("order_items", fmt, date_from, date_to)
+
+@router.get("/customers")
+async def export_customers(
+    fmt: ExportFormat = Query("csv", alias="format"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payload=Depends(require_admin),
+):
+    return await _export("customers", fmt, date_from, date_to)
+
+@router.get("/inventory-logs")
+async def export_inventory_logs(
+    fmt: ExportFormat = Query("csv", alias="format"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payload=Depends(require_admin),
+):
+    return await _export("inventory_logs", fmt, date_from, date_to)
@@ -1,65 +1,162 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
-from ..database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query, Header
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+from ..database import get_db, run_db
+from ..cache import invalidate_products
+from ..responses import FastJSONResponse
 from ..models import CreateOrder, UpdateOrderStatus
+from ..stats import dashboard_stats
+from ..search import search_index
+from ..versions import table_versions
+from .. import idempotency
+from ..inventory import inventory_engine, InsufficientStock
+from ..logwriter import log_writer
+from ..rollups import apply_order_to_rollups, order_status_rollup_sign
+from ..pagination import encode_cursor, decode_cursor
 from ..auth import verify_token
 from ..dependencies import require_admin
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
+# Orders are placed as pending; confirming them is an admin status change
+NEW_ORDER_STATUS = "pending"
+
 @router.post("")
-async def create_order(order: CreateOrder, payload=Depends(verify_token)):
+async def create_order(
+    order: CreateOrder,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255),
+    payload=Depends(verify_token),
+):
     user_id = int(payload.get("sub"))
+    if idempotency_key is None:
+        return await run_db(_create_order, user_id, order)
+    
+    # Retries of an already placed order are answered from memory, before any DB work
+    fingerprint = idempotency.request_hash(order.model_dump_json())
+    replayed = idempotency.find_cached(user_id, idempotency_key, fingerprint)
+    if replayed is not None:
+        return replayed
+    return await run_db(_create_order, user_id, order, idempotency_key, fingerprint)
+
+def _create_order(user_id: int, order: CreateOrder, idempotency_key: Optional[str] = None, fingerprint: Optional[str] = None):
+    # Merge repeated lines so each product is locked and updated once
+    quantities = {}
+    for item in order.items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail=f"Invalid quantity for product {item.product_id}")
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    if not quantities:
+        raise HTTPException(status_code=400, detail="Order has no items")
+    
+    # Always lock in ascending id order so concurrent checkouts cannot deadlock
+    product_ids = sorted(quantities)
+    placeholders = ", ".join(["%s"] * len(product_ids))
     
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
+    reservation = None
     
     try:
-        cursor.execute("SELECT phone FROM users WHERE id = %s", (user_id,))
-        user = cursor.fetchone()
+        if idempotency_key:
+            replayed = idempotency.find_stored(cursor, user_id, idempotency_key, fingerprint)
+            if replayed is not None:
+                return replayed
+            idempotency.claim(cursor, user_id, idempotency_key, fingerprint)
         
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        if inventory_engine is None:
+            cursor.execute(
+                f"SELECT id, price, stock FROM products WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+                tuple(product_ids)
+            )
+            products = {product['id']: product for product in cursor.fetchall()}
+            
+            for product_id in product_ids:
+                product = products.get(product_id)
+                if not product or product['stock'] < quantities[product_id]:
+                    raise HTTPException(status_code=400, detail=f"Insufficient stock for product {product_id}. Available: {product['stock'] if product else 0}, Requested: {quantities[product_id]}")
+        else:
+            # Stock is held by the in-process reservation; product rows are only read, never locked
+            cursor.execute(f"SELECT id, price FROM products WHERE id IN ({placeholders})", tuple(product_ids))
+            products = {product['id']: product for product in cursor.fetchall()}
+            try:
+                if len(products) < len(product_ids):
+                    missing = next(product_id for product_id in product_ids if product_id not in products)
+                    raise InsufficientStock(missing, 0)
+                reservation = inventory_engine.reserve(cursor, quantities)
+            except InsufficientStock as e:
+                raise HTTPException(status_code=400, detail=f"Insufficient stock for product {e.product_id}. Available: {e.available}, Requested: {quantities[e.product_id]}")
         
-        for item in order.items:
-            cursor.execute("SELECT stock FROM products WHERE id = %s FOR UPDATE", (item.product_id,))
-            product = cursor.fetchone()
-            if not product or product['stock'] < item.quantity:
-                raise HTTPException(status_code=400, detail=f"Insufficient stock for product {item.product_id}. Available: {product['stock'] if product else 0}, Requested: {item.quantity}")
+        # Priced from the rows read above, never from the client
+        total_amount = sum(products[product_id]['price'] * quantities[product_id] for product_id in product_ids)
         
+        # Counts the order towards the customer (rolled back with it) and checks the user exists.
+        # Locked late, like status changes do, but before the order row's foreign key check would
+        # share-lock it; checkout never touches sales_daily, which status changes lock first.
         cursor.execute(
-            "INSERT INTO orders (user_id, total_amount, status, delivery_address, created_at) VALUES (%s, %s, %s, %s, %s)",
-            (user_id, order.total_amount, order.status, "Pakistan", datetime.now())
+            "UPDATE users SET order_count = order_count + 1, updated_at = updated_at WHERE id = %s",
+            (user_id,)
         )
-        order_id = cursor.lastrowid
+        if not cursor.rowcount:
+            raise HTTPException(status_code=404, detail="User not found")
         
-        for item in order.items:
-            cursor.execute("SELECT price FROM products WHERE id = %s", (item.product_id,))
-            product = cursor.fetchone()
-            
+        if inventory_engine is None:
             cursor.execute(
-                "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
-                (order_id, item.product_id, item.quantity, product['price'])
+                "INSERT INTO orders (user_id, total_amount, status, delivery_address, created_at) VALUES (%s, %s, %s, %s, %s)",
+                (user_id, total_amount, NEW_ORDER_STATUS, "Pakistan", datetime.now())
             )
-            
+        else:
+            # stock_applied stays FALSE until the engine's flush writes this order's stock
             cursor.execute(
-                "UPDATE products SET stock = stock - %s WHERE id = %s",
-                (item.quantity, item.product_id)
+                "INSERT INTO orders (user_id, total_amount, status, delivery_address, stock_applied, created_at) VALUES (%s, %s, %s, %s, FALSE, %s)",
+                (user_id, total_amount, NEW_ORDER_STATUS, "Pakistan", datetime.now())
             )
-            
-            cursor.execute("SELECT stock FROM products WHERE id = %s", (item.product_id,))
-            new_stock = cursor.fetchone()['stock']
-            old_stock = new_stock + item.quantity
-            
+        order_id = cursor.lastrowid
+        
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
+            [(order_id, product_id, quantities[product_id], products[product_id]['price']) for product_id in product_ids]
+        )
+        
+        if inventory_engine is None:
+            # Rows are locked, so the new stock values can be computed here and written in one statement
+            new_stock = {product_id: products[product_id]['stock'] - quantities[product_id] for product_id in product_ids}
+            cases = " ".join(["WHEN %s THEN %s"] * len(product_ids))
             cursor.execute(
-                "INSERT INTO inventory_logs (product_id, old_stock, new_stock, action) VALUES (%s, %s, %s, %s)",
-                (item.product_id, old_stock, new_stock, "order_placed")
+                f"UPDATE products SET stock = CASE id {cases} END WHERE id IN ({placeholders})",
+                tuple(value for product_id in product_ids for value in (product_id, new_stock[product_id])) + tuple(product_ids)
             )
         
+        if idempotency_key:
+            idempotency.record(cursor, user_id, idempotency_key, order_id)
+        
         conn.commit()
+        if reservation is not None:
+            # products.stock is written by the engine's flush, which also invalidates listings
+            new_stock = inventory_engine.confirm(reservation, order_id, quantities)
+            table_versions.bump("orders", "order_items")
+        else:
+            log_writer.write(
+                "inventory_logs",
+                *[(product_id, products[product_id]['stock'], new_stock[product_id], "order_placed") for product_id in product_ids],
+                conn=conn
+            )
+            invalidate_products(product_ids)
+            table_versions.bump("orders", "order_items", "products")
+        if idempotency_key:
+            idempotency.idempotency_cache.set((user_id, idempotency_key), (fingerprint, order_id))
+        for product_id in product_ids:
+            search_index.set_in_stock(product_id, new_stock[product_id] > 0)
+        dashboard_stats.order_created(NEW_ORDER_STATUS, total_amount)
         
         return {"message": "Order created successfully", "order_id": order_id}
     
+    except idempotency.KeyInUse:
+        # The request that owned the key has committed; answer with its order
+        conn.rollback()
+        replayed = idempotency.find_stored(cursor, user_id, idempotency_key, fingerprint)
+        if replayed is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+        return replayed
     except HTTPException:
         conn.rollback()
         raise
@@ -67,29 +164,41 @@ async def create_order(order: CreateOrder, payload=Depends(verify_token)):
         conn.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     finally:
+        if reservation is not None:
+            # No-op after confirm; returns the units if the order was not committed
+            inventory_engine.release(reservation)
         cursor.close()
         conn.close()
 
+OrderStatus = Literal["pending", "confirmed", "shipped", "delivered", "cancelled"]
+
 @router.get("/user/{user_id}")
-async def get_user_orders(user_id: int, credentials=Depends(verify_token)):
-    conn = get_db()
+async def get_user_orders(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    credentials=Depends(verify_token),
+):
+    filters = {"user_id": user_id, "status": status, "date_from": date_from, "date_to": date_to}
+    return FastJSONResponse(await run_db(_get_user_orders, filters, limit, cursor))
+
+def _get_user_orders(filters: dict, limit: int, page_cursor: Optional[str]):
+    conditions, params = _order_conditions(filters, page_cursor)
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
         cursor.execute(
-            "SELECT id, user_id, total_amount, status, delivery_address, created_at FROM orders WHERE user_id = %s ORDER BY created_at DESC",
-            (user_id,)
+            f"SELECT o.id, o.user_id, o.total_amount, o.status, o.delivery_address, o.created_at FROM orders o WHERE {conditions} ORDER BY o.created_at DESC, o.id DESC LIMIT %s",
+            params + (limit + 1,)
         )
         orders = cursor.fetchall()
-        
-        for order in orders:
-            cursor.execute(
-                "SELECT oi.product_id, p.name as product_name, oi.quantity, p.price FROM order_items oi JOIN products p ON oi.product_id = p.id WHERE oi.order_id = %s",
-                (order['id'],)
-            )
-            order['items'] = cursor.fetchall()
-        
-        return {"orders": orders}
+        return _order_page(cursor, orders, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -97,46 +206,117 @@ async def get_user_orders(user_id: int, credentials=Depends(verify_token)):
         conn.close()
 
 @router.get("/admin/orders")
-async def get_admin_orders(payload=Depends(require_admin)):
-    conn = get_db()
+async def get_admin_orders(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payload=Depends(require_admin),
+):
+    filters = {"status": status, "date_from": date_from, "date_to": date_to}
+    return FastJSONResponse(await run_db(_get_admin_orders, filters, limit, cursor))
+
+def _get_admin_orders(filters: dict, limit: int, page_cursor: Optional[str]):
+    conditions, params = _order_conditions(filters, page_cursor)
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
         cursor.execute(
-            "SELECT o.id, o.user_id, u.name as customer_name, u.phone as customer_phone, o.total_amount, o.status, o.delivery_address, o.created_at FROM orders o JOIN users u ON o.user_id = u.id ORDER BY o.created_at DESC"
+            f"SELECT o.id, o.user_id, u.name as customer_name, u.phone as customer_phone, o.total_amount, o.status, o.delivery_address, o.created_at FROM orders o JOIN users u ON o.user_id = u.id WHERE {conditions} ORDER BY o.created_at DESC, o.id DESC LIMIT %s",
+            params + (limit + 1,)
         )
         orders = cursor.fetchall()
-        
-        for order in orders:
-            cursor.execute(
-                "SELECT oi.product_id, p.name as product_name, oi.quantity, p.price FROM order_items oi JOIN products p ON oi.product_id = p.id WHERE oi.order_id = %s",
-                (order['id'],)
-            )
-            order['items'] = cursor.fetchall()
-        
-        return {"orders": orders}
+        return _order_page(cursor, orders, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
         conn.close()
 
+def _order_conditions(filters: dict, page_cursor: Optional[str]):
+    conditions = []
+    params = []
+    
+    if filters.get("user_id") is not None:
+        conditions.append("o.user_id = %s")
+        params.append(filters["user_id"])
+    if filters.get("status"):
+        conditions.append("o.status = %s")
+        params.append(filters["status"])
+    if filters.get("date_from"):
+        conditions.append("o.created_at >= %s")
+        params.append(filters["date_from"])
+    if filters.get("date_to"):
+        # date_to is inclusive: everything before the start of the following day
+        conditions.append("o.created_at < %s")
+        params.append(filters["date_to"] + timedelta(days=1))
+    
+    if page_cursor:
+        value, last_id = decode_cursor(page_cursor, "created_at")
+        try:
+            created_at = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor: bad timestamp")
+        conditions.append("(o.created_at < %s OR (o.created_at = %s AND o.id < %s))")
+        params.extend([created_at, created_at, last_id])
+    
+    return " AND ".join(conditions) or "1 = 1", tuple(params)
+
+def _order_page(cursor, orders, limit: int):
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor("created_at", orders[-1]['created_at'], orders[-1]['id'])
+    
+    _load_order_items(cursor, orders)
+    return {"orders": orders, "next_cursor": next_cursor}
+
+def _load_order_items(cursor, orders):
+    """Attach items to every order with a single query instead of one per order."""
+    items_by_order = {order['id']: [] for order in orders}
+    if not items_by_order:
+        return
+    
+    placeholders = ", ".join(["%s"] * len(items_by_order))
+    cursor.execute(
+        f"SELECT oi.order_id, oi.product_id, p.name as product_name, oi.quantity, p.price FROM order_items oi JOIN products p ON oi.product_id = p.id WHERE oi.order_id IN ({placeholders}) ORDER BY oi.order_id, oi.id",
+        tuple(items_by_order)
+    )
+    for item in cursor.fetchall():
+        items_by_order[item.pop('order_id')].append(item)
+    
+    for order in orders:
+        order['items'] = items_by_order[order['id']]
+
 @router.put("/admin/orders/{order_id}")
 async def update_order_status(order_id: int, update: UpdateOrderStatus, payload=Depends(require_admin)):
-    conn = get_db()
-    cursor = conn.cursor()
     admin_id = int(payload.get("sub"))
+    return await run_db(_update_order_status, order_id, update, admin_id)
+
+def _update_order_status(order_id: int, update: UpdateOrderStatus, admin_id: int):
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
     
     try:
+        cursor.execute("SELECT status, total_amount FROM orders WHERE id = %s FOR UPDATE", (order_id,))
+        previous = cursor.fetchone()
+        
         cursor.execute("UPDATE orders SET status = %s, updated_at = %s WHERE id = %s", 
                       (update.status, datetime.now(), order_id))
         
-        cursor.execute(
-            "INSERT INTO activity_logs (admin_id, action, details) VALUES (%s, %s, %s)",
-            (admin_id, f"Order {order_id} status updated", f"New status: {update.status}")
-        )
+        sign = order_status_rollup_sign(previous['status'], update.status) if previous else 0
+        if sign:
+            apply_order_to_rollups(cursor, order_id, sign)
         
         conn.commit()
+        log_writer.write("activity_logs", (admin_id, f"Order {order_id} status updated", f"New status: {update.status}"), conn=conn)
+        table_versions.bump("orders")
+        if previous:
+            dashboard_stats.order_status_changed(previous['status'], update.status, previous['total_amount'])
         return {"message": "Order status updated"}
     except Exception as e:
         conn.rollback()
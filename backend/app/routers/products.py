@@ -1,34 +1,180 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query, Request, Response
+from typing import List, Literal, Optional
+import functools
 import os
-import uuid
 from datetime import datetime
-from ..database import get_db
+from mysql.connector.errors import IntegrityError, DataError
+from ..database import get_db, run_db
 from ..models import Product
+from ..bulk import RowError, iter_lines, iter_csv_records, iter_ndjson_records, validate_product
+from ..images import process_upload, materialize, discard, path_to_url, url_to_path, remove_files
+from ..cache import (
+    catalog_cache, PRODUCT_LISTINGS, product_tag, product_images_key,
+    invalidate_product_listings, invalidate_product_images
+)
+from ..stats import dashboard_stats
+from ..search import search_index, search_async
+from ..responses import FastJSONResponse
+from ..versions import table_versions
+from ..workers import publish
+from ..inventory import inventory_engine
+from ..pagination import encode_cursor, decode_cursor, decimal_value
 from ..auth import verify_token
 from ..dependencies import require_admin
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', 500))
+BULK_MAX_ROWS = int(os.getenv('BULK_MAX_ROWS', 100000))
+# Only the first errors are listed in the report; the count covers all of them
+BULK_MAX_ERRORS = 1000
+
+PRODUCT_SORTS = {
+    # sort name: (column, direction)
+    "newest": ("p.id", "DESC"),
+    "price_asc": ("p.price", "ASC"),
+    "price_desc": ("p.price", "DESC"),
+}
+
 @router.get("")
-async def get_products():
-    conn = get_db()
+async def get_products(
+    limit: int = Query(24, ge=1, le=100),
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    category: Optional[str] = None,
+    color: Optional[str] = None,
+    material: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: Literal["newest", "price_asc", "price_desc"] = "newest",
+):
+    filters = {
+        "category_id": category_id,
+        "category": category,
+        "color": color,
+        "material": material,
+        "min_price": min_price,
+        "max_price": max_price,
+    }
+    key = ("products", limit, cursor, sort) + tuple(filters.values())
+    body = catalog_cache.get(key)
+    if body is None:
+        loader = functools.partial(_get_products, limit, cursor, filters, sort)
+        body = await run_db(catalog_cache.load_json, key, loader, _product_listing_tags)
+    return Response(content=body, media_type="application/json")
+
+def _product_listing_tags(data):
+    return [PRODUCT_LISTINGS] + [product_tag(product['id']) for product in data['products']]
+
+def _get_products(limit: int, page_cursor: Optional[str], filters: dict, sort: str):
+    column, direction = PRODUCT_SORTS[sort]
+    conditions = ["p.stock > 0"]
+    params = []
+    
+    for field in ("category_id", "category", "color", "material"):
+        if filters[field] is not None:
+            conditions.append(f"p.{field} = %s")
+            params.append(filters[field])
+    if filters["min_price"] is not None:
+        conditions.append("p.price >= %s")
+        params.append(filters["min_price"])
+    if filters["max_price"] is not None:
+        conditions.append("p.price <= %s")
+        params.append(filters["max_price"])
+    
+    if page_cursor:
+        value, last_id = decode_cursor(page_cursor, sort)
+        op = "<" if direction == "DESC" else ">"
+        if column == "p.id":
+            conditions.append(f"p.id {op} %s")
+            params.append(last_id)
+        else:
+            value = decimal_value(value)
+            conditions.append(f"({column} {op} %s OR ({column} = %s AND p.id {op} %s))")
+            params.extend([value, value, last_id])
+    
+    query = (
+        "SELECT p.id, p.name, p.description, p.price, p.stock, p.category, p.category_id, p.color, p.material, p.size, p.created_at "
+        f"FROM products p WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {column} {direction}" + (f", p.id {direction}" if column != "p.id" else "") +
+        " LIMIT %s"
+    )
+    params.append(limit + 1)
+    
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute(
-            "SELECT p.id, p.name, p.description, p.price, p.stock, p.category, p.category_id, p.color, p.material, p.size, p.created_at, (SELECT GROUP_CONCAT(image_url) FROM product_images WHERE product_id = p.id) as image_urls FROM products p WHERE p.stock > 0"
-        )
+        cursor.execute(query, tuple(params))
         products = cursor.fetchall()
         
-        for product in products:
-            if product['image_urls']:
-                product['images'] = product['image_urls'].split(',')
-            else:
-                product['images'] = []
-            del product['image_urls']
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor(sort, last["price"] if column == "p.price" else last["id"], last["id"])
         
-        return {"products": products}
+        _attach_images(cursor, products)
+        return {"products": products, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+        conn.close()
+
+def _attach_images(cursor, products):
+    """Attach image URLs and variants to every product with a single query."""
+    images_by_product = {product['id']: [] for product in products}
+    if images_by_product:
+        placeholders = ", ".join(["%s"] * len(images_by_product))
+        cursor.execute(
+            f"SELECT product_id, image_url, thumbnail_url, medium_url FROM product_images WHERE product_id IN ({placeholders}) ORDER BY product_id, sort_order, id",
+            tuple(images_by_product)
+        )
+        for image in cursor.fetchall():
+            images_by_product[image['product_id']].append(image)
+    
+    for product in products:
+        images = images_by_product[product['id']]
+        product['images'] = [image['image_url'] for image in images]
+        product['image_variants'] = [
+            {"original": image['image_url'], "thumbnail": image['thumbnail_url'], "medium": image['medium_url']}
+            for image in images
+        ]
+
+@router.get("/search")
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(24, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    category_id: Optional[int] = None,
+    category: Optional[str] = None,
+    color: Optional[str] = None,
+):
+    ranked, facets = await search_async(q, category_id=category_id, category=category, color=color)
+    page_ids = ranked[offset:offset + limit]
+    products = await run_db(_get_products_by_ids, page_ids) if page_ids else []
+    next_offset = offset + limit if offset + limit < len(ranked) else None
+    return FastJSONResponse({"products": products, "total": len(ranked), "next_offset": next_offset, "facets": facets})
+
+def _get_products_by_ids(product_ids: List[int]):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    conn = get_db(readonly=True)
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute(
+            "SELECT p.id, p.name, p.description, p.price, p.stock, p.category, p.category_id, p.color, p.material, p.size, p.created_at "
+            f"FROM products p WHERE p.id IN ({placeholders})",
+            tuple(product_ids)
+        )
+        by_id = {product['id']: product for product in cursor.fetchall()}
+        # Keep the relevance order from the index
+        products = [by_id[product_id] for product_id in product_ids if product_id in by_id]
+        _attach_images(cursor, products)
+        return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -37,18 +183,18 @@ async def get_products():
 
 @router.post("")
 async def create_product(product: Product, payload=Depends(require_admin)):
+    return await run_db(_create_product, product)
+
+def _create_product(product: Product):
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id FROM categories WHERE id = %s", (product.category_id,))
-        category_exists = cursor.fetchone()
-        if not category_exists:
-            raise HTTPException(status_code=400, detail="Category does not exist")
-        
         cursor.execute("SELECT name FROM categories WHERE id = %s", (product.category_id,))
         category_record = cursor.fetchone()
-        category_name = category_record['name'] if category_record else product.category
+        if not category_record:
+            raise HTTPException(status_code=400, detail="Category does not exist")
+        category_name = category_record['name']
         
         cursor.execute(
             "INSERT INTO products (name, description, price, stock, category, category_id, color, material, size, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
@@ -56,6 +202,10 @@ async def create_product(product: Product, payload=Depends(require_admin)):
         )
         product_id = cursor.lastrowid
         conn.commit()
+        invalidate_product_listings()
+        table_versions.bump("products")
+        search_index.upsert({**product.model_dump(), "id": product_id, "category": category_name})
+        dashboard_stats.add(products=1)
         return {"message": "Product created", "id": product_id}
     except Exception as e:
         conn.rollback()
@@ -64,26 +214,178 @@ async def create_product(product: Product, payload=Depends(require_admin)):
         cursor.close()
         conn.close()
 
+@router.post("/bulk")
+async def bulk_upsert_products(
+    request: Request,
+    fmt: Optional[Literal["csv", "ndjson"]] = Query(None, alias="format"),
+    payload=Depends(require_admin),
+):
+    """Create or update products from a CSV (with header) or NDJSON body.
+
+    Rows with an `id` are upserted on it; rows without one are inserted.
+    Categories are given by `category_id` or `category` name. Valid rows are
+    written in chunks of BULK_CHUNK_SIZE per transaction; invalid rows are
+    skipped and listed in the report.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in content_type else "ndjson" if "json" in content_type else None
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass format=csv|ndjson")
+    
+    categories = await run_db(_load_categories)
+    category_ids = {name.lower(): category_id for category_id, name in categories.items()}
+    report = {"processed": 0, "inserted": 0, "upserted": 0, "failed": 0, "errors": []}
+    upserted_ids = []
+    
+    def fail(row_number, message):
+        report["failed"] += 1
+        if len(report["errors"]) < BULK_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+    
+    parse = iter_csv_records if fmt == "csv" else iter_ndjson_records
+    chunk = []
+    async for row_number, raw in parse(iter_lines(request.stream())):
+        if report["processed"] >= BULK_MAX_ROWS:
+            # Earlier chunks are already committed, so report them rather than failing the request
+            fail(row_number, f"Row limit of {BULK_MAX_ROWS} reached; this and later rows were not read")
+            break
+        report["processed"] += 1
+        try:
+            if isinstance(raw, RowError):
+                raise raw
+            product_id, product = validate_product(raw, categories, category_ids)
+        except RowError as e:
+            fail(row_number, str(e))
+            continue
+        chunk.append((row_number, product_id, product))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            _merge_chunk_report(report, upserted_ids, fail, await run_db(_upsert_products_chunk, chunk))
+            chunk = []
+    if chunk:
+        _merge_chunk_report(report, upserted_ids, fail, await run_db(_upsert_products_chunk, chunk))
+    
+    if report["inserted"] or report["upserted"]:
+        invalidate_product_listings()
+        table_versions.bump("products")
+        await run_db(_refresh_after_bulk, upserted_ids)
+    return report
+
+def _merge_chunk_report(report, upserted_ids, fail, result):
+    report["inserted"] += result["inserted"]
+    report["upserted"] += len(result["upserted_ids"])
+    upserted_ids.extend(result["upserted_ids"])
+    for row_number, message in result["errors"]:
+        fail(row_number, message)
+
+def _load_categories():
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute("SELECT id, name FROM categories")
+        return {row['id']: row['name'] for row in cursor.fetchall()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+        conn.close()
+
+PRODUCT_COLUMNS = "name, description, price, stock, category, category_id, color, material, size"
+
+def _product_values(product: Product):
+    return (product.name, product.description, product.price, product.stock, product.category, product.category_id, product.color, product.material, product.size)
+
+def _upsert_products_chunk(chunk):
+    """Write one chunk of validated rows in a single transaction.
+
+    Both statements go through executemany, which mysql.connector sends as one
+    multi-row INSERT each. If a statement fails on a row (duplicate key, bad
+    value), its rows are retried one by one so only the offending rows are
+    reported. Deadlocks and lock wait timeouts have already rolled back the
+    whole transaction, so they fail the chunk instead.
+    """
+    inserts = [(row_number, product) for row_number, product_id, product in chunk if product_id is None]
+    upserts = [(row_number, product_id, product) for row_number, product_id, product in chunk if product_id is not None]
+    insert_sql = f"INSERT INTO products ({PRODUCT_COLUMNS}, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    upsert_sql = (
+        f"INSERT INTO products (id, {PRODUCT_COLUMNS}, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name), description = VALUES(description), price = VALUES(price), "
+        "stock = VALUES(stock), category = VALUES(category), category_id = VALUES(category_id), "
+        "color = VALUES(color), material = VALUES(material), size = VALUES(size)"
+    )
+    now = datetime.now()
+    result = {"inserted": 0, "upserted_ids": [], "errors": []}
+    
+    def write(sql, rows):
+        """Returns the row numbers written."""
+        try:
+            cursor.executemany(sql, [params for _, params in rows])
+            return [row_number for row_number, _ in rows]
+        except (IntegrityError, DataError):
+            written = []
+            for row_number, params in rows:
+                try:
+                    cursor.execute(sql, params)
+                    written.append(row_number)
+                except (IntegrityError, DataError) as e:
+                    result["errors"].append((row_number, str(e)))
+            return written
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        if inserts:
+            written = write(insert_sql, [(row_number, _product_values(product) + (now,)) for row_number, product in inserts])
+            result["inserted"] += len(written)
+        if upserts:
+            written = set(write(upsert_sql, [(row_number, (product_id,) + _product_values(product) + (now,)) for row_number, product_id, product in upserts]))
+            result["upserted_ids"] = [product_id for row_number, product_id, _ in upserts if row_number in written]
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        return {"inserted": 0, "upserted_ids": [], "errors": [(row_number, f"Database error: {str(e)}") for row_number, _, _ in chunk]}
+    finally:
+        cursor.close()
+        conn.close()
+
+def _refresh_after_bulk(upserted_ids):
+    # Stock may have been overwritten and many rows added: reload the derived in-memory state once
+    if inventory_engine is not None:
+        for product_id in upserted_ids:
+            inventory_engine.forget(product_id)
+    search_index.rebuild()
+    publish("search.rebuild", "")
+    dashboard_stats.reconcile()
+
 @router.put("/{product_id}")
 async def update_product(product_id: int, product: Product, payload=Depends(require_admin)):
+    return await run_db(_update_product, product_id, product)
+
+def _update_product(product_id: int, product: Product):
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id FROM categories WHERE id = %s", (product.category_id,))
-        category_exists = cursor.fetchone()
-        if not category_exists:
-            raise HTTPException(status_code=400, detail="Category does not exist")
-        
         cursor.execute("SELECT name FROM categories WHERE id = %s", (product.category_id,))
         category_record = cursor.fetchone()
-        category_name = category_record['name'] if category_record else product.category
+        if not category_record:
+            raise HTTPException(status_code=400, detail="Category does not exist")
+        category_name = category_record['name']
         
         cursor.execute(
             "UPDATE products SET name = %s, description = %s, price = %s, stock = %s, category = %s, category_id = %s, color = %s, material = %s, size = %s WHERE id = %s",
             (product.name, product.description, product.price, product.stock, category_name, product.category_id, product.color, product.material, product.size, product_id)
         )
         conn.commit()
+        invalidate_product_listings()
+        table_versions.bump("products")
+        if inventory_engine is not None:
+            inventory_engine.forget(product_id)
+        if cursor.rowcount or search_index.contains(product_id):
+            search_index.upsert({**product.model_dump(), "id": product_id, "category": category_name})
         return {"message": "Product updated"}
     except Exception as e:
         conn.rollback()
@@ -94,12 +396,28 @@ async def update_product(product_id: int, product: Product, payload=Depends(requ
 
 @router.delete("/{product_id}")
 async def delete_product(product_id: int, payload=Depends(require_admin)):
+    return await run_db(_delete_product, product_id)
+
+def _delete_product(product_id: int):
     conn = get_db()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     
     try:
+        cursor.execute(
+            "SELECT image_url, thumbnail_url, medium_url, content_hash FROM product_images WHERE product_id = %s",
+            (product_id,)
+        )
+        images = cursor.fetchall()
         cursor.execute("DELETE FROM products WHERE id = %s", (product_id,))
+        deleted = cursor.rowcount
         conn.commit()
+        _release_image_files(conn, cursor, images)
+        invalidate_product_images(product_id)
+        table_versions.bump("products", "product_images")
+        if inventory_engine is not None:
+            inventory_engine.forget(product_id)
+        search_index.remove(product_id)
+        dashboard_stats.add(products=-deleted)
         return {"message": "Product deleted"}
     except Exception as e:
         conn.rollback()
@@ -110,16 +428,7 @@ async def delete_product(product_id: int, payload=Depends(require_admin)):
 
 @router.post("/{product_id}/images")
 async def upload_product_images(product_id: int, files: List[UploadFile] = File(...), payload=Depends(require_admin)):
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT id FROM products WHERE id = %s", (product_id,))
-        product = cursor.fetchone()
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-    finally:
-        cursor.close()
-        conn.close()
+    await run_db(_check_product_exists, product_id)
     
     if len(files) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 images allowed per upload")
@@ -133,30 +442,48 @@ async def upload_product_images(product_id: int, files: List[UploadFile] = File(
         if file_size > MAX_FILE_SIZE:
             raise HTTPException(status_code=400, detail=f"File {i+1} is too large. Maximum size is 5MB.")
     
+    for i, file in enumerate(files):
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail=f"File {i+1} is not an image")
+    
+    stored = []
+    try:
+        for file in files:
+            stored.append(await process_upload(file))
+        return await run_db(_save_product_images, product_id, stored)
+    finally:
+        for image in stored:
+            discard(image)
+
+def _check_product_exists(product_id: int):
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT id FROM products WHERE id = %s", (product_id,))
+        product = cursor.fetchone()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+    finally:
+        cursor.close()
+        conn.close()
+
+def _save_product_images(product_id: int, stored):
     uploaded_images = []
     conn = get_db()
     cursor = conn.cursor()
     
     try:
-        for i, file in enumerate(files):
-            if not file.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail=f"File {i+1} is not an image")
-            
-            ext = file.filename.split('.')[-1]
-            filename = f"{uuid.uuid4().hex}.{ext}"
-            filepath = os.path.join("uploads", filename)
-            
-            contents = await file.read()
-            with open(filepath, "wb") as f:
-                f.write(contents)
-            
-            image_url = f"/uploads/{filename}"
+        for i, image in enumerate(stored):
+            image_url = path_to_url(image["original"])
             is_primary = (i == 0)
             
             cursor.execute(
-                "INSERT INTO product_images (product_id, image_url, is_primary, sort_order) VALUES (%s, %s, %s, %s)",
-                (product_id, image_url, is_primary, i)
+                "INSERT INTO product_images (product_id, image_url, thumbnail_url, medium_url, content_hash, is_primary, sort_order) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                (product_id, image_url, path_to_url(image["thumbnail"]), path_to_url(image["medium"]), image["content_hash"], is_primary, i)
             )
+            # The new row's index lock makes a concurrent delete of the same content wait for this
+            # commit; one that already holds its lock made the insert wait until its files were gone
+            materialize(image)
             uploaded_images.append(image_url)
         
         cursor.execute(
@@ -165,6 +492,8 @@ async def upload_product_images(product_id: int, files: List[UploadFile] = File(
         )
         
         conn.commit()
+        invalidate_product_images(product_id)
+        table_versions.bump("product_images")
         return {"message": f"{len(uploaded_images)} images uploaded successfully", "image_urls": uploaded_images}
     
     except Exception as e:
@@ -176,12 +505,19 @@ async def upload_product_images(product_id: int, files: List[UploadFile] = File(
 
 @router.get("/{product_id}/images")
 async def get_product_images(product_id: int):
-    conn = get_db()
+    key = product_images_key(product_id)
+    body = catalog_cache.get(key)
+    if body is None:
+        body = await run_db(catalog_cache.load_json, key, functools.partial(_get_product_images, product_id))
+    return Response(content=body, media_type="application/json")
+
+def _get_product_images(product_id: int):
+    conn = get_db(readonly=True)
     cursor = conn.cursor(dictionary=True)
     
     try:
         cursor.execute(
-            "SELECT id, image_url, is_primary, sort_order FROM product_images WHERE product_id = %s ORDER BY sort_order",
+            "SELECT id, image_url, thumbnail_url, medium_url, is_primary, sort_order FROM product_images WHERE product_id = %s ORDER BY sort_order",
             (product_id,)
         )
         images = cursor.fetchall()
@@ -194,12 +530,15 @@ async def get_product_images(product_id: int):
 
 @router.delete("/{product_id}/images/{image_id}")
 async def delete_product_image(product_id: int, image_id: int, payload=Depends(require_admin)):
+    return await run_db(_delete_product_image, product_id, image_id)
+
+def _delete_product_image(product_id: int, image_id: int):
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
         cursor.execute(
-            "SELECT image_url FROM product_images WHERE id = %s AND product_id = %s",
+            "SELECT image_url, thumbnail_url, medium_url, content_hash FROM product_images WHERE id = %s AND product_id = %s",
             (image_id, product_id)
         )
         image = cursor.fetchone()
@@ -207,21 +546,19 @@ async def delete_product_image(product_id: int, image_id: int, payload=Depends(r
         if not image:
             raise HTTPException(status_code=404, detail="Image not found for this product")
         
-        image_path = os.path.join(os.getcwd(), image['image_url'][1:])
-        if os.path.exists(image_path):
-            os.remove(image_path)
-        
         cursor.execute(
             "DELETE FROM product_images WHERE id = %s AND product_id = %s",
             (image_id, product_id)
         )
-        
         cursor.execute(
             "UPDATE products SET image_count = (SELECT COUNT(*) FROM product_images WHERE product_id = %s) WHERE id = %s",
             (product_id, product_id)
         )
         
         conn.commit()
+        _release_image_files(conn, cursor, [image])
+        invalidate_product_images(product_id)
+        table_versions.bump("product_images")
         return {"message": "Image deleted successfully"}
     except Exception as e:
         conn.rollback()
@@ -229,3 +566,28 @@ async def delete_product_image(product_id: int, image_id: int, payload=Depends(r
     finally:
         cursor.close()
         conn.close()
+
+def _release_image_files(conn, cursor, images):
+    """Delete the files of removed product_images rows once no other row references their content.
+
+    Called after the deleting transaction commits, so a rollback never loses
+    files. Each check is its own transaction and keeps its FOR UPDATE lock
+    while the files are removed: an upload of the same content cannot insert
+    its row until then, and afterwards restores what it meant to reuse
+    (images.materialize). Failures are logged; the rows are already gone.
+    """
+    for image in images:
+        try:
+            if image['content_hash']:
+                cursor.execute(
+                    "SELECT COUNT(*) as refs FROM product_images WHERE content_hash = %s FOR UPDATE",
+                    (image['content_hash'],)
+                )
+                if cursor.fetchone()['refs']:
+                    conn.commit()
+                    continue
+            remove_files(url_to_path(image[column]) for column in ('image_url', 'thumbnail_url', 'medium_url'))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Could not remove files of {image['image_url']}: {str(e)}")
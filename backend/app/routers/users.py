@@ -1,8 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime
-from ..database import get_db
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError
+from ..database import get_db, run_db
 from ..models import UserRegister, UserLogin
-from ..auth import hash_password, verify_password, create_token, verify_token
+from ..stats import dashboard_stats
+from ..versions import table_versions
+from ..auth import hash_password_async, verify_password_async, password_needs_rehash, create_token, verify_token
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -19,20 +23,44 @@ async def register_options():
 @router.post("/register")
 async def register(user: UserRegister):
     print(f"Registration attempt for: {user.email}")
+    # Checked before hashing so repeated attempts with a taken email never cost a bcrypt round
+    if await run_db(_email_registered, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_pwd = await hash_password_async(user.password)
+    return await run_db(_register, user, hashed_pwd)
+
+def _email_registered(email: str) -> bool:
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id FROM users WHERE email = %s", (user.email,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        hashed_pwd = hash_password(user.password)
-        cursor.execute(
-            "INSERT INTO users (name, email, password, phone, created_at) VALUES (%s, %s, %s, %s, %s)",
-            (user.name, user.email, hashed_pwd, "", datetime.now())
-        )
+        cursor.execute("SELECT id FROM users WHERE email = %s", (email,))
+        return cursor.fetchone() is not None
+    except Exception as e:
+        print(f"Database error in registration: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cursor.close()
+        conn.close()
+
+def _register(user: UserRegister, hashed_pwd: str):
+    conn = get_db()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        try:
+            cursor.execute(
+                "INSERT INTO users (name, email, password, phone, created_at) VALUES (%s, %s, %s, %s, %s)",
+                (user.name, user.email, hashed_pwd, "", datetime.now())
+            )
+        except IntegrityError as e:
+            # Registered by a concurrent request since the check in register()
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise HTTPException(status_code=400, detail="Email already registered")
+            raise
         conn.commit()
+        table_versions.bump("users")
+        dashboard_stats.add(users=1)
         
         return {"message": "Registration successful"}
     except HTTPException:
@@ -59,31 +87,52 @@ async def login_options():
 @router.post("/login")
 async def login(user: UserLogin):
     print(f"Login attempt for: {user.email}")
+    db_user = await run_db(_get_login_user, user.email)
+    
+    if not db_user or not await verify_password_async(user.password, db_user['password']):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    
+    if password_needs_rehash(db_user['password']):
+        try:
+            await run_db(_update_password, db_user['id'], await hash_password_async(user.password))
+        except Exception as e:
+            print(f"Password rehash failed for user {db_user['id']}: {str(e)}")
+    
+    token = create_token({"sub": str(db_user['id']), "role": "user"})
+    
+    return {
+        "token": token,
+        "user": {
+            "id": db_user['id'],
+            "name": db_user['name'],
+            "email": db_user['email']
+        }
+    }
+
+def _get_login_user(email: str):
     conn = get_db()
     cursor = conn.cursor(dictionary=True)
     
     try:
-        cursor.execute("SELECT id, name, email, password FROM users WHERE email = %s", (user.email,))
-        db_user = cursor.fetchone()
-        
-        if not db_user or not verify_password(user.password, db_user['password']):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        token = create_token({"sub": str(db_user['id']), "role": "user"})
-        
-        return {
-            "token": token,
-            "user": {
-                "id": db_user['id'],
-                "name": db_user['name'],
-                "email": db_user['email']
-            }
-        }
-    except HTTPException:
-        raise
+        cursor.execute("SELECT id, name, email, password FROM users WHERE email = %s", (email,))
+        return cursor.fetchone()
     except Exception as e:
         print(f"Database error in login: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
         conn.close()
+
+def _update_password(user_id: int, hashed_pwd: str):
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("UPDATE users SET password = %s WHERE id = %s", (hashed_pwd, user_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
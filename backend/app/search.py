@@ -0,0 +1,283 @@
+import os
+import math
+import re
+import asyncio
+import functools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from .database import get_db, db_executor
+from .workers import publish, subscribe, on_resync
+
+# Relative weight of a term hit in each indexed field
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "color": 1.5,
+    "material": 1.5,
+    "description": 1.0,
+}
+FUZZY_PENALTY = 0.6
+PREFIX_PENALTY = 0.8
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Scoring and typo matching are pure Python under the index lock, so queries run here
+# instead of blocking the event loop; more threads than a few would only wait on the lock
+search_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SEARCH_WORKERS', 2)), thread_name_prefix="search")
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        # Crude plural folding so "bags" finds "bag" and vice versa
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _within_distance(a, b, limit):
+    """Levenshtein distance between a and b is at most limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+class ProductSearchIndex:
+    """In-memory inverted index over product name, description, color, material and category.
+
+    Queries are ranked with a BM25-style score; every query term must match a
+    document exactly, as a prefix, or within a small edit distance. Kept in sync
+    by the product write endpoints and rebuilt from the database at startup.
+    Other worker processes are told which products changed and reload them.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._docs = {}  # product_id -> {"category_id", "category", "color", "in_stock", "length", "terms"}
+        self._postings = defaultdict(dict)  # term -> {product_id: weighted term frequency}
+        self._trigram_terms = defaultdict(set)  # trigram -> terms containing it
+        self._total_length = 0.0
+
+    def rebuild(self):
+        conn = get_db()
+        cursor = conn.cursor(dictionary=True)
+        
+        try:
+            cursor.execute("SELECT id, name, description, category, category_id, color, material, stock FROM products")
+            products = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        
+        with self._lock:
+            self._clear()
+            for product in products:
+                self._add(product)
+        print(f"Search index built with {len(products)} products")
+
+    def upsert(self, product: dict):
+        """Index or re-index a product row (id, name, description, category, category_id, color, material, stock)."""
+        with self._lock:
+            self._remove(product["id"])
+            self._add(product)
+        publish("search.product", product["id"])
+
+    def remove(self, product_id: int):
+        with self._lock:
+            self._remove(product_id)
+        publish("search.product", product_id)
+
+    def refresh(self, product_ids):
+        """Re-read these products from the database, dropping the ones that no longer exist."""
+        product_ids = list(product_ids)
+        conn = get_db()
+        cursor = conn.cursor(dictionary=True)
+        
+        try:
+            placeholders = ", ".join(["%s"] * len(product_ids))
+            cursor.execute(
+                f"SELECT id, name, description, category, category_id, color, material, stock FROM products WHERE id IN ({placeholders})",
+                tuple(product_ids)
+            )
+            products = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+            for product in products:
+                self._add(product)
+
+    def contains(self, product_id: int):
+        with self._lock:
+            return product_id in self._docs
+
+    def set_in_stock(self, product_id: int, in_stock: bool):
+        with self._lock:
+            doc = self._docs.get(product_id)
+            if doc is not None:
+                doc["in_stock"] = in_stock
+        publish("search.stock", f"{product_id}:{int(in_stock)}")
+
+    def _add(self, product):
+        terms = defaultdict(float)
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field)):
+                terms[token] += weight
+                length += weight
+        
+        self._docs[product["id"]] = {
+            "category_id": product.get("category_id"),
+            "category": product.get("category"),
+            "color": product.get("color"),
+            "in_stock": (product.get("stock") or 0) > 0,
+            "length": length,
+            "terms": tuple(terms),
+        }
+        self._total_length += length
+        for term, frequency in terms.items():
+            if not self._postings[term]:
+                for trigram in _trigrams(term):
+                    self._trigram_terms[trigram].add(term)
+            self._postings[term][product["id"]] = frequency
+
+    def _remove(self, product_id):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                for trigram in _trigrams(term):
+                    self._trigram_terms[trigram].discard(term)
+
+    def _expand(self, token, is_last):
+        """Index terms a query token can match, with a score multiplier for each."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        
+        candidates = set()
+        for trigram in _trigrams(token):
+            candidates |= self._trigram_terms.get(trigram, set())
+        
+        limit = 0 if len(token) < 4 else 1 if len(token) < 8 else 2
+        for term in candidates:
+            if term in matches:
+                continue
+            if is_last and term.startswith(token):
+                matches[term] = PREFIX_PENALTY
+            elif limit and _within_distance(token, term, limit):
+                matches[term] = FUZZY_PENALTY
+        return matches
+
+    def search(self, query: str, category_id=None, category=None, color=None, in_stock_only=True):
+        """Return (ranked product ids, facets) for a query.
+
+        Facets count the matching documents per category and per color before
+        the category/color filters are applied, so they can drive filter UIs.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], {"category": [], "color": []}
+        
+        with self._lock:
+            doc_count = len(self._docs) or 1
+            average_length = (self._total_length / doc_count) or 1.0
+            scores = None
+            
+            for position, token in enumerate(tokens):
+                token_scores = defaultdict(float)
+                for term, multiplier in self._expand(token, position == len(tokens) - 1).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for product_id, frequency in postings.items():
+                        doc = self._docs[product_id]
+                        if in_stock_only and not doc["in_stock"]:
+                            continue
+                        # BM25 with k1=1.2, b=0.75
+                        tf = frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * doc["length"] / average_length))
+                        token_scores[product_id] = max(token_scores[product_id], idf * tf * multiplier)
+                
+                if scores is None:
+                    scores = dict(token_scores)
+                else:
+                    scores = {product_id: score + token_scores[product_id] for product_id, score in scores.items() if product_id in token_scores}
+                if not scores:
+                    break
+            
+            scores = scores or {}
+            category_counts = defaultdict(int)
+            category_names = {}
+            color_counts = defaultdict(int)
+            for product_id in scores:
+                doc = self._docs[product_id]
+                category_counts[doc["category_id"]] += 1
+                category_names[doc["category_id"]] = doc["category"]
+                if doc["color"]:
+                    color_counts[doc["color"]] += 1
+            
+            ranked = [
+                product_id for product_id, _ in sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+                if (category_id is None or self._docs[product_id]["category_id"] == category_id)
+                and (category is None or (self._docs[product_id]["category"] or "").lower() == category.lower())
+                and (color is None or (self._docs[product_id]["color"] or "").lower() == color.lower())
+            ]
+        
+        facets = {
+            "category": sorted(
+                ({"id": key, "name": category_names[key], "count": count} for key, count in category_counts.items()),
+                key=lambda facet: (-facet["count"], facet["name"] or "")
+            ),
+            "color": sorted(
+                ({"value": key, "count": count} for key, count in color_counts.items()),
+                key=lambda facet: (-facet["count"], facet["value"])
+            ),
+        }
+        return ranked, facets
+
+search_index = ProductSearchIndex()
+
+async def search_async(query: str, **filters):
+    """Run search_index.search on the search executor and await (ranked ids, facets)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(search_executor, functools.partial(search_index.search, query, **filters))
+
+def _in_background(func, *args):
+    future = db_executor.submit(func, *args)
+    future.add_done_callback(lambda done: done.exception() and print(f"Search index reload failed: {str(done.exception())}"))
+
+def _set_in_stock_locally(payload):
+    product_id, in_stock = payload.split(":")
+    with search_index._lock:
+        doc = search_index._docs.get(int(product_id))
+        if doc is not None:
+            doc["in_stock"] = in_stock == "1"
+
+# Changes made by other worker processes; reloads run on the DB executor, off the request
+subscribe("search.product", lambda payload: _in_background(search_index.refresh, [int(payload)]))
+subscribe("search.stock", _set_in_stock_locally)
+subscribe("search.rebuild", lambda payload: _in_background(search_index.rebuild))
+on_resync(lambda: _in_background(search_index.rebuild))
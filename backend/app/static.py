@@ -0,0 +1,32 @@
+import os
+import re
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# <sha256>.<ext> originals and <sha256>_<variant>.<ext> resized copies
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64}(?:_[a-z]+)?)\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LEGACY_CACHE_CONTROL = "public, max-age=86400"
+
+class ContentAddressedStaticFiles(StaticFiles):
+    """StaticFiles for the upload store.
+
+    A content-addressed file can never change, so it is served with a
+    year-long immutable Cache-Control and a strong ETag derived from its
+    name (the content hash). If-None-Match is answered with 304.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        match = CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+        if match:
+            headers = {"etag": f'"{match.group(1)}"', "cache-control": IMMUTABLE_CACHE_CONTROL}
+        else:
+            headers = {"cache-control": LEGACY_CACHE_CONTROL}
+        
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,107 @@
+import os
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from .database import get_db, run_db
+from .workers import shared_state
+
+# Orders in these states count towards the dashboard's order and sales figures
+COUNTED_ORDER_STATUSES = ('confirmed', 'shipped', 'delivered')
+
+STATS_RECONCILE_INTERVAL = float(os.getenv('STATS_RECONCILE_INTERVAL', 300))
+
+class DashboardStats:
+    """Admin dashboard counters, kept current by the write endpoints.
+
+    Reads never touch the database. reconcile() recomputes everything with
+    full scans and replaces the counters, correcting any drift; it runs at
+    startup and then every STATS_RECONCILE_INTERVAL seconds. Under serve.py
+    the counters are kept in the workers' shared state, so each worker's
+    writes show up on every worker's dashboard.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {"users": 0, "products": 0, "orders": 0, "total_sales": Decimal(0)}
+        self.reconciled_at = None
+
+    def snapshot(self) -> dict:
+        state = shared_state()
+        if state is not None:
+            values = state.stats()
+            total_sales = Decimal(values.pop("total_sales_cents")).scaleb(-2)
+            return {**values, "total_sales": total_sales}
+        with self._lock:
+            return dict(self._values)
+
+    def add(self, users: int = 0, products: int = 0, orders: int = 0, total_sales=0):
+        state = shared_state()
+        if state is not None:
+            cents = int((Decimal(str(total_sales)) * 100).to_integral_value())
+            state.add_stats(users=users, products=products, orders=orders, total_sales_cents=cents)
+            return
+        with self._lock:
+            self._values["users"] += users
+            self._values["products"] += products
+            self._values["orders"] += orders
+            self._values["total_sales"] += Decimal(str(total_sales))
+
+    def order_created(self, status: str, total_amount):
+        if status in COUNTED_ORDER_STATUSES:
+            self.add(orders=1, total_sales=total_amount)
+
+    def order_status_changed(self, old_status: str, new_status: str, total_amount):
+        was_counted = old_status in COUNTED_ORDER_STATUSES
+        is_counted = new_status in COUNTED_ORDER_STATUSES
+        if is_counted and not was_counted:
+            self.add(orders=1, total_sales=total_amount)
+        elif was_counted and not is_counted:
+            self.add(orders=-1, total_sales=-Decimal(str(total_amount)))
+
+    def reconcile(self):
+        conn = get_db()
+        cursor = conn.cursor(dictionary=True)
+        
+        try:
+            cursor.execute("SELECT COUNT(*) as count FROM users")
+            users = cursor.fetchone()['count']
+            cursor.execute("SELECT COUNT(*) as count FROM products")
+            products = cursor.fetchone()['count']
+            placeholders = ", ".join(["%s"] * len(COUNTED_ORDER_STATUSES))
+            cursor.execute(
+                f"SELECT COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total_sales FROM orders WHERE status IN ({placeholders})",
+                COUNTED_ORDER_STATUSES
+            )
+            orders = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        
+        fresh = {"users": users, "products": products, "orders": orders['count'], "total_sales": Decimal(orders['total_sales'])}
+        state = shared_state()
+        if state is not None:
+            previous = self.snapshot()
+            state.set_stats({
+                "users": users, "products": products, "orders": orders['count'],
+                "total_sales_cents": int((fresh["total_sales"] * 100).to_integral_value()),
+            })
+            if self.reconciled_at is not None and fresh != previous:
+                print(f"Dashboard stats drift corrected: {previous} -> {fresh}")
+            self.reconciled_at = time.time()
+            return
+        with self._lock:
+            if self.reconciled_at is not None and fresh != self._values:
+                print(f"Dashboard stats drift corrected: {self._values} -> {fresh}")
+            self._values = fresh
+            self.reconciled_at = time.time()
+
+dashboard_stats = DashboardStats()
+
+async def reconcile_periodically(interval: float = STATS_RECONCILE_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_db(dashboard_stats.reconcile)
+        except Exception as e:
+            print(f"Dashboard stats reconciliation failed: {str(e)}")
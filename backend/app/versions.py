@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+import uuid
+from .workers import TABLES, shared_state
+
+# Bounds how long a client can keep revalidating against data changed outside
+# the API (manual SQL, another deployment): ETags also roll over every this many seconds.
+ETAG_MAX_AGE = int(os.getenv('ETAG_MAX_AGE', 300))
+
+class TableVersions:
+    """Per-table change counters, bumped by the endpoints that write each table.
+
+    A response built from a set of tables is unchanged as long as none of their
+    counters moved, so the counters can stand in for the body when computing
+    ETags. A random boot id keeps tags from one process from matching another's.
+    Under serve.py the counters and boot id live in the workers' shared state,
+    so every worker hands out, and accepts, the same tags.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._boot = uuid.uuid4().hex[:8]
+        self._last_bump = float("-inf")
+
+    def bump(self, *tables: str):
+        state = shared_state()
+        if state is not None:
+            state.bump(tables)
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._last_bump = time.monotonic()
+
+    def seconds_since_write(self) -> float:
+        state = shared_state()
+        if state is not None:
+            return state.seconds_since_write()
+        return time.monotonic() - self._last_bump
+
+    def token(self, tables) -> str:
+        state = shared_state()
+        if state is not None:
+            boot, versions = state.boot_id, [str(version) for version in state.versions(tables)]
+        else:
+            boot = self._boot
+            with self._lock:
+                versions = [str(self._versions.get(table, 0)) for table in tables]
+        epoch = int(time.time() // ETAG_MAX_AGE) if ETAG_MAX_AGE > 0 else 0
+        return "-".join([boot, str(epoch)] + versions)
+
+    def snapshot(self) -> dict:
+        state = shared_state()
+        if state is not None:
+            return {table: version for table, version in zip(TABLES, state.versions(TABLES)) if version}
+        with self._lock:
+            return dict(self._versions)
+
+table_versions = TableVersions()
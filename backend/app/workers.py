@@ -0,0 +1,181 @@
+import os
+import mmap
+import fcntl
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Set by serve.py when running several worker processes; unset means a single process
+WORKER_STATE_FILE = os.getenv('WORKER_STATE_FILE')
+
+MAGIC = b"SSBAGS01"
+# Tables with a shared version counter (TableVersions); bumping any other table is an error
+TABLES = ("users", "products", "product_images", "categories", "orders", "order_items")
+# Shared dashboard counters (DashboardStats); sales are kept in cents
+STATS = ("users", "products", "orders", "total_sales_cents")
+# Events kept for workers that have not caught up yet; one that falls further behind resyncs
+EVENT_SLOTS = 4096
+
+_HEADER = struct.Struct("<8s8sdQ")  # magic, boot id, last write (epoch seconds), last event seq
+_COUNTER = struct.Struct("<q")
+_EVENT = struct.Struct("<QQ24s24s")  # seq, publisher pid, topic, payload
+_VERSIONS_AT = _HEADER.size
+_STATS_AT = _VERSIONS_AT + len(TABLES) * _COUNTER.size
+_EVENTS_AT = _STATS_AT + len(STATS) * _COUNTER.size
+STATE_SIZE = _EVENTS_AT + EVENT_SLOTS * _EVENT.size
+
+def create_state_file(path: str):
+    """Create (or truncate) the state file for a new set of workers, with a fresh boot id."""
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, uuid.uuid4().hex[:8].encode(), 0.0, 0))
+        f.write(bytes(STATE_SIZE - _HEADER.size))
+
+class SharedState:
+    """Version counters, dashboard counters and an event ring shared by all worker processes.
+
+    The state lives in a small file mapped into every worker. Writers hold an
+    flock on it; readers of counters never lock. Events are (topic, payload)
+    pairs that tell the other workers to drop or refresh their in-process
+    copies (catalog cache entries, search documents, revoked users). Each
+    worker applies the events it has not seen yet at the start of every
+    request (WorkerSyncMiddleware), so a write in one worker is visible to the
+    next request handled by any other.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), STATE_SIZE)
+        magic, boot, _, seq = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise RuntimeError(f"{path} is not a worker state file")
+        self.boot_id = boot.decode()
+        self._pid = os.getpid()
+        # flock only excludes other processes; threads of this one take this lock first
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._seen = seq
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _read(self, offset: int) -> int:
+        return _COUNTER.unpack_from(self._map, offset)[0]
+
+    def _add(self, offset: int, amount: int):
+        _COUNTER.pack_into(self._map, offset, self._read(offset) + amount)
+
+    def bump(self, tables):
+        with self._locked():
+            for table in tables:
+                self._add(_VERSIONS_AT + TABLES.index(table) * _COUNTER.size, 1)
+            struct.pack_into("<d", self._map, 16, time.time())
+
+    def versions(self, tables) -> list:
+        return [self._read(_VERSIONS_AT + TABLES.index(table) * _COUNTER.size) for table in tables]
+
+    def seconds_since_write(self) -> float:
+        return time.time() - struct.unpack_from("<d", self._map, 16)[0]
+
+    def stats(self) -> dict:
+        return {name: self._read(_STATS_AT + index * _COUNTER.size) for index, name in enumerate(STATS)}
+
+    def add_stats(self, **deltas):
+        with self._locked():
+            for name, amount in deltas.items():
+                self._add(_STATS_AT + STATS.index(name) * _COUNTER.size, amount)
+
+    def set_stats(self, values: dict):
+        with self._locked():
+            for name, value in values.items():
+                _COUNTER.pack_into(self._map, _STATS_AT + STATS.index(name) * _COUNTER.size, value)
+
+    def publish(self, topic: str, *payloads):
+        """Append one event per payload for the other workers."""
+        encoded_topic = topic.encode()
+        encoded = [str(payload).encode() for payload in payloads]
+        if len(encoded_topic) > 24 or any(len(payload) > 24 for payload in encoded):
+            raise ValueError(f"Worker event {topic} {payloads} does not fit in an event slot")
+        with self._locked():
+            seq = _HEADER.unpack_from(self._map, 0)[3]
+            for payload in encoded:
+                seq += 1
+                slot = _EVENTS_AT + (seq % EVENT_SLOTS) * _EVENT.size
+                _EVENT.pack_into(self._map, slot, seq, self._pid, encoded_topic, payload)
+            # Entries are written before the header moves, so readers never see a half-written event
+            struct.pack_into("<Q", self._map, 24, seq)
+
+    def poll(self):
+        """Return the new events published by other workers, or None if some were already overwritten.
+
+        Must be called with _poll_lock held, so events are applied in order.
+        """
+        seq = struct.unpack_from("<Q", self._map, 24)[0]
+        if seq == self._seen:
+            return []
+        events = []
+        lost = seq - self._seen > EVENT_SLOTS
+        for expected in range(max(self._seen + 1, seq - EVENT_SLOTS + 1), seq + 1):
+            slot = _EVENTS_AT + (expected % EVENT_SLOTS) * _EVENT.size
+            event_seq, pid, topic, payload = _EVENT.unpack_from(self._map, slot)
+            if event_seq != expected:
+                lost = True
+                break
+            if pid != self._pid:
+                events.append((topic.rstrip(b"\0").decode(), payload.rstrip(b"\0").decode()))
+        self._seen = seq
+        return None if lost else events
+
+_state = None
+_state_lock = threading.Lock()
+_subscribers = {}  # topic -> handlers taking the payload string
+_resync_handlers = []
+
+def shared_state():
+    """This process's view of the shared state, or None when running a single worker."""
+    global _state
+    if WORKER_STATE_FILE is None:
+        return None
+    # Opened per process: an flock taken through a descriptor inherited across fork would not exclude
+    if _state is None or _state._pid != os.getpid():
+        with _state_lock:
+            if _state is None or _state._pid != os.getpid():
+                _state = SharedState(WORKER_STATE_FILE)
+    return _state
+
+def publish(topic: str, *payloads):
+    state = shared_state()
+    if state is not None and payloads:
+        state.publish(topic, *payloads)
+
+def subscribe(topic: str, handler):
+    _subscribers.setdefault(topic, []).append(handler)
+
+def on_resync(handler):
+    """Register a handler that rebuilds local state from scratch after events were missed."""
+    _resync_handlers.append(handler)
+
+def sync_workers():
+    """Apply the events other workers published since the last call. Cheap when there are none."""
+    state = shared_state()
+    if state is None:
+        return
+    with state._poll_lock:
+        events = state.poll()
+        if events is None:
+            print(f"Worker {os.getpid()} fell behind on shared events; resyncing local state")
+            handlers = [(handler, ()) for handler in _resync_handlers]
+        else:
+            handlers = [(handler, (payload,)) for topic, payload in events for handler in _subscribers.get(topic, ())]
+        for handler, args in handlers:
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"Worker event handler {getattr(handler, '__name__', handler)} failed: {str(e)}")
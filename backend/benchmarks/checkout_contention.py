@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark: concurrent checkouts on a few hot SKUs.
+
+Registers a pool of shoppers, then has every shopper place orders whose
+carts all draw from the same small set of hot products, in shuffled order.
+Reports throughput, latency percentiles and error counts (insufficient
+stock, deadlocks/other 5xx). Run it with different --cart-size values:
+with set-based placement the per-order latency should stay roughly flat.
+
+The hot products need enough stock for the run, e.g.
+    UPDATE products SET stock = 1000000 WHERE id IN (1, 2, 3, 4);
+
+Start the API with rate limiting and load shedding off, since every
+shopper shares one address and the run is meant to saturate the server:
+    RATE_LIMIT_ENABLED=false MAX_CONCURRENT_REQUESTS=0 python serve.py
+
+Requires a running backend and httpx:
+    pip install httpx
+    python benchmarks/checkout_contention.py --hot-products 1,2,3,4 --cart-size 4
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def shopper_token(client, index, run_id):
+    email = f"bench-{run_id}-{index}@example.com"
+    password = "bench-password"
+    response = await client.post("/api/auth/register", json={"name": f"Bench {index}", "email": email, "password": password})
+    response.raise_for_status()
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    data = response.json()
+    return data["token"], data["user"]["id"]
+
+
+async def shopper(client, token, user_id, args, deadline, latencies, outcomes):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        product_ids = random.sample(args.hot_products, min(args.cart_size, len(args.hot_products)))
+        items = [{"product_id": product_id, "quantity": 1} for product_id in product_ids]
+        while len(items) < args.cart_size:
+            items.append({"product_id": random.choice(args.hot_products), "quantity": 1})
+        random.shuffle(items)
+        body = {"user_id": user_id, "items": items}
+
+        start = time.perf_counter()
+        response = await client.post("/api/orders", json=body, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code == 200:
+            outcomes["ok"] += 1
+        elif response.status_code == 400:
+            outcomes["insufficient_stock"] += 1
+        elif "Deadlock" in response.text:
+            outcomes["deadlock"] += 1
+        else:
+            outcomes[f"http_{response.status_code}"] += 1
+
+
+async def main(args):
+    run_id = uuid.uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=args.shoppers + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        shoppers = await asyncio.gather(*(shopper_token(client, i, run_id) for i in range(args.shoppers)))
+
+        latencies = []
+        outcomes = collections.Counter()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            shopper(client, token, user_id, args, deadline, latencies, outcomes)
+            for token, user_id in shoppers
+        ))
+        elapsed = time.perf_counter() - start
+
+    print(f"shoppers={args.shoppers} cart_size={args.cart_size} hot_products={args.hot_products}")
+    print(f"orders attempted: {len(latencies)}  in {elapsed:.1f}s  ->  {outcomes['ok'] / elapsed:.1f} successful orders/s")
+    print("latency ms: " + "  ".join(f"p{p}={percentile(latencies, p):.1f}" for p in (50, 95, 99)) if latencies else "no requests")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:20} {count}")
+    return 1 if outcomes["deadlock"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--hot-products", type=lambda v: [int(x) for x in v.split(",")], default=[1, 2, 3, 4])
+    parser.add_argument("--cart-size", type=int, default=4, help="line items per order")
+    parser.add_argument("--shoppers", type=int, default=32, help="concurrent checkout clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test: /health latency while slow admin queries are in flight.
+
+Measures /health latency on an idle server, then again while several clients
+keep /api/admin/customers busy. Database work runs on the DB executor, so the
+p99 of /health should stay roughly where it was. Exits non-zero if the loaded
+p99 is more than MAX_RATIO times the idle p99 (with a small absolute floor).
+
+Start the API with rate limiting and load shedding off, since every
+client shares one address and the run is meant to saturate the server:
+    RATE_LIMIT_ENABLED=false MAX_CONCURRENT_REQUESTS=0 python serve.py
+
+Requires a running backend and httpx:
+    pip install httpx
+    python benchmarks/health_under_load.py --base-url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(samples):
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": statistics.mean(samples),
+    }
+
+
+async def admin_token(client, email, password):
+    response = await client.post("/api/admin/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def probe_health(client, requests, interval):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/health")
+        samples.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def hammer_customers(client, token, stop):
+    headers = {"Authorization": f"Bearer {token}"}
+    completed = 0
+    while not stop.is_set():
+        response = await client.get("/api/admin/customers", headers=headers)
+        response.raise_for_status()
+        completed += 1
+    return completed
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.load_clients + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        token = await admin_token(client, args.admin_email, args.admin_password)
+
+        idle = await probe_health(client, args.requests, args.interval)
+
+        stop = asyncio.Event()
+        load = [asyncio.create_task(hammer_customers(client, token, stop)) for _ in range(args.load_clients)]
+        await asyncio.sleep(0.5)
+        loaded = await probe_health(client, args.requests, args.interval)
+        stop.set()
+        customer_calls = sum(await asyncio.gather(*load))
+
+    idle_stats = summary(idle)
+    loaded_stats = summary(loaded)
+    print(f"{'':10}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}   (ms)")
+    for label, stats in (("idle", idle_stats), ("loaded", loaded_stats)):
+        print(f"{label:10}" + "".join(f"{stats[key]:10.2f}" for key in ("p50", "p95", "p99", "mean")))
+    print(f"/api/admin/customers calls completed under load: {customer_calls}")
+
+    budget = max(idle_stats["p99"] * args.max_ratio, args.floor_ms)
+    if loaded_stats["p99"] > budget:
+        print(f"FAIL: loaded p99 {loaded_stats['p99']:.2f} ms exceeds budget {budget:.2f} ms")
+        return 1
+    print(f"OK: loaded p99 {loaded_stats['p99']:.2f} ms within budget {budget:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--admin-email", default=os.getenv("ADMIN_EMAIL", "admin@ssbags.com"))
+    parser.add_argument("--admin-password", default=os.getenv("ADMIN_PASSWORD", "admin123"))
+    parser.add_argument("--requests", type=int, default=500, help="/health probes per phase")
+    parser.add_argument("--interval", type=float, default=0.005, help="pause between probes (s)")
+    parser.add_argument("--load-clients", type=int, default=20, help="concurrent /api/admin/customers callers")
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="allowed loaded/idle p99 ratio")
+    parser.add_argument("--floor-ms", type=float, default=20.0, help="p99 budget never drops below this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
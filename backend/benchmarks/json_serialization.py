@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Serialization micro-benchmark for large list responses.
+
+Builds rows shaped like mysql.connector dictionary rows of the admin order
+list (Decimal amounts, datetime timestamps, nested items) and times turning
+the response body into bytes with:
+  - jsonable_encoder + json.dumps (FastAPI's default path),
+  - app.responses.dumps with the stdlib backend,
+  - app.responses.dumps with orjson, when installed.
+Every variant's output is checked to decode to the same JSON as the first.
+No server or database is needed:
+
+    python benchmarks/json_serialization.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from app import responses  # noqa: E402
+
+STATUSES = ["pending", "confirmed", "shipped", "delivered", "cancelled"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_orders(count):
+    start = datetime(2024, 1, 1)
+    orders = []
+    for order_id in range(count, 0, -1):
+        items = [
+            {"product_id": random.randint(1, 2000), "name": f"Leather Tote {n}", "quantity": random.randint(1, 3),
+             "price": Decimal(random.randint(50000, 1500000)) / 100}
+            for n in range(random.randint(1, 4))
+        ]
+        orders.append({
+            "id": order_id,
+            "user_id": random.randint(1, 5000),
+            "customer_name": f"Customer {order_id % 997}",
+            "customer_phone": f"0300{order_id:07d}",
+            "total_amount": sum(item["price"] * item["quantity"] for item in items),
+            "status": random.choice(STATUSES),
+            "delivery_address": "House 12, Street 4, Gulberg III, Lahore",
+            "created_at": start + timedelta(seconds=order_id * 37),
+            "items": items,
+        })
+    return {"orders": orders, "next_cursor": "eyJ2IjoiMjAyNC0wMS0wMVQwMDowMDowMCIsImlkIjoxfQ"}
+
+
+def stdlib_dumps(data):
+    orjson, responses.orjson = responses.orjson, None
+    try:
+        return responses.dumps(data)
+    finally:
+        responses.orjson = orjson
+
+
+def run(name, serialize, data, repeat, expected):
+    body = serialize(data)
+    if expected is not None and json.loads(body) != expected:
+        print(f"{name}: output differs from the reference")
+        return None
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        serialize(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{name:34} p50={percentile(timings, 50):8.1f} ms  p95={percentile(timings, 95):8.1f} ms  {len(body) / 1024:8.0f} KiB")
+    return percentile(timings, 50)
+
+
+def main(args):
+    random.seed(args.seed)
+    data = make_orders(args.rows)
+    variants = [
+        ("jsonable_encoder + json.dumps", lambda value: json.dumps(jsonable_encoder(value), separators=(",", ":")).encode("utf-8")),
+        ("responses.dumps (stdlib)", stdlib_dumps),
+    ]
+    if responses.orjson is not None:
+        variants.append(("responses.dumps (orjson)", responses.dumps))
+    else:
+        print("orjson is not installed; skipping that backend")
+
+    print(f"{args.rows} rows, {args.repeat} runs each")
+    expected = json.loads(variants[0][1](data))
+    results = [(name, run(name, serialize, data, args.repeat, expected)) for name, serialize in variants]
+    baseline = results[0][1]
+    for name, median in results[1:]:
+        if median:
+            print(f"{name}: {baseline / median:.1f}x faster than {results[0][0]}")
+    return 0 if all(median is not None for _, median in results) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(main(parser.parse_args()))
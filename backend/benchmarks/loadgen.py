@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: a weighted mix of shopper and admin traffic.
+
+Each virtual user loops over scenarios picked by weight (--mix): browsing
+product pages, searching, loading product images, logging in, checking out
+one to three products, reading its order history, and admin dashboard and
+report views. Shoppers are the users created by benchmarks/seed.py
+(seed-<n>@example.com); run that first so the data looks like production.
+
+Reports throughput and latency percentiles per scenario. /metrics is scraped
+before and after the run, so database statements per request (from
+db_queries_per_request) are shown next to each route; other traffic hitting
+the server during the run is counted too.
+
+Start the API with rate limiting and load shedding off, since every
+virtual user shares one address and the run is meant to saturate the server:
+    RATE_LIMIT_ENABLED=false MAX_CONCURRENT_REQUESTS=0 python serve.py
+
+Requires a running backend and httpx:
+    pip install httpx
+    python benchmarks/seed.py
+    python benchmarks/loadgen.py --concurrency 64 --duration 60
+    python benchmarks/loadgen.py --mix browse=80,search=20 --duration 30
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import re
+import sys
+import time
+import uuid
+
+import httpx
+
+DEFAULT_MIX = "browse=45,search=10,images=10,login=5,checkout=10,history=10,dashboard=5,reports=5"
+SEARCH_TERMS = ["leather", "black tote", "travel backpack", "mini clutch", "canvas", "wallet", "duffel", "crossbody red"]
+SORTS = ["newest", "price_asc", "price_desc"]
+METRIC_LINE = re.compile(r'^db_queries_per_request_(sum|count)\{route="(.*)"\} (\S+)$')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Shared:
+    """Data the scenarios draw from, loaded once before the run."""
+
+    def __init__(self, args):
+        self.args = args
+        self.admin_headers = {}
+        self.shoppers = []  # (email, headers, user_id)
+        self.product_ids = []
+        self.categories = []
+
+
+async def scenario_browse(client, shared, shopper):
+    params = {"limit": 24, "sort": random.choice(SORTS)}
+    if shared.categories and random.random() < 0.5:
+        params["category_id"] = random.choice(shared.categories)
+    response = await client.get("/api/products", params=params)
+    # Some shoppers go on to the next page
+    if response.status_code == 200 and random.random() < 0.3 and response.json().get("next_cursor"):
+        params["cursor"] = response.json()["next_cursor"]
+        response = await client.get("/api/products", params=params)
+    return "/api/products", response
+
+
+async def scenario_search(client, shared, shopper):
+    response = await client.get("/api/products/search", params={"q": random.choice(SEARCH_TERMS), "limit": 24})
+    return "/api/products/search", response
+
+
+async def scenario_images(client, shared, shopper):
+    response = await client.get(f"/api/products/{random.choice(shared.product_ids)}/images")
+    return "/api/products/{product_id}/images", response
+
+
+async def scenario_login(client, shared, shopper):
+    email, _, _ = shopper
+    response = await client.post("/api/auth/login", json={"email": email, "password": shared.args.password})
+    return "/api/auth/login", response
+
+
+async def scenario_checkout(client, shared, shopper):
+    _, headers, user_id = shopper
+    product_ids = random.sample(shared.product_ids, min(random.randint(1, 3), len(shared.product_ids)))
+    body = {"user_id": user_id, "items": [{"product_id": product_id, "quantity": 1} for product_id in product_ids]}
+    response = await client.post("/api/orders", json=body, headers={**headers, "Idempotency-Key": uuid.uuid4().hex})
+    return "/api/orders", response
+
+
+async def scenario_history(client, shared, shopper):
+    _, headers, user_id = shopper
+    response = await client.get(f"/api/orders/user/{user_id}", params={"limit": 20}, headers=headers)
+    return "/api/orders/user/{user_id}", response
+
+
+async def scenario_dashboard(client, shared, shopper):
+    response = await client.get("/api/admin/stats", headers=shared.admin_headers)
+    return "/api/admin/stats", response
+
+
+async def scenario_reports(client, shared, shopper):
+    params = {"period": random.choice(["daily", "monthly"])}
+    if random.random() < 0.5:
+        params["group_by"] = random.choice(["category", "product"])
+    response = await client.get("/api/admin/reports", params=params, headers=shared.admin_headers)
+    return "/api/admin/reports", response
+
+
+SCENARIOS = {
+    "browse": scenario_browse,
+    "search": scenario_search,
+    "images": scenario_images,
+    "login": scenario_login,
+    "checkout": scenario_checkout,
+    "history": scenario_history,
+    "dashboard": scenario_dashboard,
+    "reports": scenario_reports,
+}
+
+
+async def login(client, path, email, password):
+    response = await client.post(path, json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()
+
+
+async def prepare(client, args):
+    shared = Shared(args)
+    data = await login(client, "/api/admin/login", args.admin_email, args.admin_password)
+    shared.admin_headers = {"Authorization": f"Bearer {data['token']}"}
+
+    # Logins are bcrypt-bound; a handful at a time keeps setup from tripping the hash pool limit
+    semaphore = asyncio.Semaphore(8)
+
+    async def shopper_login(index):
+        email = f"seed-{index}@example.com"
+        async with semaphore:
+            data = await login(client, "/api/auth/login", email, args.password)
+        return email, {"Authorization": f"Bearer {data['token']}"}, data["user"]["id"]
+
+    shared.shoppers = await asyncio.gather(*(shopper_login(index) for index in range(args.shoppers)))
+
+    response = await client.get("/api/categories")
+    response.raise_for_status()
+    shared.categories = [category["id"] for category in response.json()["categories"]]
+    params = {"limit": 100}
+    while len(shared.product_ids) < args.products:
+        response = await client.get("/api/products", params=params)
+        response.raise_for_status()
+        page = response.json()
+        shared.product_ids.extend(product["id"] for product in page["products"] if product["stock"] > 0)
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    if not shared.product_ids:
+        raise SystemExit("No products in stock; run benchmarks/seed.py first")
+    return shared
+
+
+async def scrape_db_queries(client):
+    """Return {route: [statements, requests]} from db_queries_per_request."""
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    totals = collections.defaultdict(lambda: [0.0, 0.0])
+    for line in response.text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            totals[match.group(2)][0 if match.group(1) == "sum" else 1] = float(match.group(3))
+    return totals
+
+
+async def virtual_user(client, shared, scenarios, weights, deadline, results):
+    while time.perf_counter() < deadline:
+        scenario = random.choices(scenarios, weights=weights)[0]
+        shopper = random.choice(shared.shoppers)
+        start = time.perf_counter()
+        try:
+            route, response = await SCENARIOS[scenario](client, shared, shopper)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            route, status = scenario, type(e).__name__
+        result = results[route]
+        result["latencies"].append((time.perf_counter() - start) * 1000)
+        result["statuses"][status] += 1
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        shared = await prepare(client, args)
+        print(f"{len(shared.shoppers)} shoppers logged in, {len(shared.product_ids)} products in stock")
+        before = await scrape_db_queries(client)
+
+        results = collections.defaultdict(lambda: {"latencies": [], "statuses": collections.Counter()})
+        scenarios = list(args.mix)
+        weights = [args.mix[name] for name in scenarios]
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, shared, scenarios, weights, deadline, results)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        after = await scrape_db_queries(client)
+
+    total = sum(len(result["latencies"]) for result in results.values())
+    failures = 0
+    print(f"concurrency={args.concurrency} duration={elapsed:.1f}s mix={','.join(f'{k}={v:g}' for k, v in args.mix.items())}")
+    print(f"{total} scenario runs  ->  {total / elapsed:.1f}/s")
+    print(f"{'route':36} {'runs':>7} {'/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7}  statuses")
+    for route in sorted(results):
+        latencies = results[route]["latencies"]
+        statuses = results[route]["statuses"]
+        failures += sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 500))
+        statements = after[route][0] - before[route][0]
+        requests = after[route][1] - before[route][1]
+        db_per_request = f"{statements / requests:.1f}" if requests else "-"
+        print(
+            f"{route:36} {len(latencies):>7} {len(latencies) / elapsed:>7.1f} "
+            + " ".join(f"{percentile(latencies, p):>8.1f}" for p in (50, 95, 99))
+            + f" {db_per_request:>7}  " + " ".join(f"{status}:{count}" for status, count in sorted(statuses.items(), key=str))
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--shoppers", type=int, default=50, help="seeded users to log in and act as")
+    parser.add_argument("--products", type=int, default=500, help="in-stock products to spread checkouts over")
+    parser.add_argument("--password", default="bench-password", help="password given to benchmarks/seed.py")
+    parser.add_argument("--admin-email", default="admin@ssbags.com")
+    parser.add_argument("--admin-password", default="admin123")
+    sys.exit(asyncio.run(main(parser.parse_args())))
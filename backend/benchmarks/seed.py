@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for benchmarks.
+
+Fills the database configured in .env (DB_HOST, DB_NAME, ...) with users,
+products, product images, orders and order items, then rebuilds the sales
+rollups and customer order aggregates so reports and the customer
+directory match the seeded orders. Rows are written with multi-row
+inserts in batches, so a few hundred thousand rows take seconds.
+
+Seeded users are seed-<n>@example.com (n from 0) with the password given by
+--password, which is what benchmarks/loadgen.py logs in with. Run it against
+a disposable database; it only adds rows (except the rollups and customer
+aggregates, which are rebuilt from all orders).
+
+    python benchmarks/seed.py --users 5000 --products 2000 --orders 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.database import DATABASE_CONFIG  # noqa: E402
+
+COLORS = ["Black", "Brown", "Red", "Blue", "Beige", "White", "Green", "Grey", "Pink", "Navy"]
+MATERIALS = ["Leather", "Canvas", "Nylon", "Cotton", "Suede", "Polyester", "Jute"]
+SIZES = ["Small", "Medium", "Large"]
+ADJECTIVES = ["Classic", "Urban", "Vintage", "Compact", "Travel", "Everyday", "Premium", "Mini", "Slim", "Weekend"]
+NOUNS = ["Backpack", "Tote", "Satchel", "Clutch", "Duffel", "Messenger", "Crossbody", "Wallet", "Shopper", "Handbag"]
+# Weighted like a shop where most orders have moved past pending
+ORDER_STATUSES = ["pending"] * 15 + ["confirmed"] * 20 + ["shipped"] * 15 + ["delivered"] * 45 + ["cancelled"] * 5
+BATCH_SIZE = 1000
+
+
+def inserted_ids(cursor, count):
+    # executemany sends an INSERT as one multi-row statement; lastrowid is the id of its
+    # first row and the rest follow on (innodb_autoinc_lock_mode 1 or 2 without interleaving)
+    return list(range(cursor.lastrowid, cursor.lastrowid + count))
+
+
+def batched_insert(cursor, conn, sql, rows):
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        cursor.executemany(sql, batch)
+        ids.extend(inserted_ids(cursor, len(batch)))
+        conn.commit()
+    return ids
+
+
+def seed_categories(cursor, conn):
+    cursor.execute("SELECT id FROM categories")
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        return ids
+    batched_insert(cursor, conn, "INSERT INTO categories (name, description, status) VALUES (%s, %s, 'active')",
+                   [(noun + "s", f"Seeded {noun.lower()} category") for noun in NOUNS])
+    cursor.execute("SELECT id FROM categories")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def seed_users(cursor, conn, args, now):
+    hashed = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt(args.bcrypt_rounds)).decode("utf-8")
+    cursor.execute("SELECT COUNT(*) FROM users WHERE email LIKE 'seed-%@example.com'")
+    existing = cursor.fetchone()[0]
+    rows = [
+        (f"Seed User {n}", f"seed-{n}@example.com", hashed, f"0300{n:07d}"[-11:], now - timedelta(days=random.uniform(0, args.days)))
+        for n in range(existing, args.users)
+    ]
+    batched_insert(cursor, conn, "INSERT INTO users (name, email, password, phone, created_at) VALUES (%s, %s, %s, %s, %s)", rows)
+    cursor.execute("SELECT id FROM users WHERE email LIKE 'seed-%@example.com'")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def seed_products(cursor, conn, args, categories, now):
+    cursor.execute("SELECT id, name FROM categories")
+    category_names = dict(cursor.fetchall())
+    rows = []
+    for n in range(args.products):
+        category_id = random.choice(categories)
+        name = f"{random.choice(ADJECTIVES)} {random.choice(NOUNS)} {n}"
+        rows.append((
+            name, f"{name} in {random.choice(MATERIALS).lower()}, seeded for benchmarks.",
+            round(random.uniform(500, 15000), 2), random.randint(0, args.max_stock),
+            category_names[category_id], category_id, random.choice(COLORS), random.choice(MATERIALS),
+            random.choice(SIZES), now - timedelta(days=random.uniform(0, args.days)),
+        ))
+    product_ids = batched_insert(cursor, conn,
+                                 "INSERT INTO products (name, description, price, stock, category, category_id, color, material, size, created_at) "
+                                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", rows)
+    products = [(product_id, row[2]) for product_id, row in zip(product_ids, rows)]
+
+    images = []
+    for product_id, _ in products:
+        for position in range(args.images_per_product):
+            url = f"/uploads/seed/{product_id}_{position}.jpg"
+            images.append((product_id, url, url, url, position == 0, position))
+    batched_insert(cursor, conn,
+                   "INSERT INTO product_images (product_id, image_url, thumbnail_url, medium_url, is_primary, sort_order) "
+                   "VALUES (%s, %s, %s, %s, %s, %s)", images)
+    if args.images_per_product:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            batch = product_ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                "UPDATE products SET image_count = %s, image_url = CONCAT('/uploads/seed/', id, '_0.jpg') "
+                f"WHERE id IN ({', '.join(['%s'] * len(batch))})",
+                (args.images_per_product, *batch)
+            )
+    conn.commit()
+    return products
+
+
+def seed_orders(cursor, conn, args, users, products, now):
+    # A few products get most of the orders, as in a real catalog
+    weights = [1 / (rank + 1) for rank in range(len(products))]
+    for start in range(0, args.orders, BATCH_SIZE):
+        count = min(BATCH_SIZE, args.orders - start)
+        orders = []
+        carts = []
+        for _ in range(count):
+            cart = {}
+            for product_id, price in random.choices(products, weights=weights, k=random.randint(1, args.max_items)):
+                quantity, _ = cart.get(product_id, (0, price))
+                cart[product_id] = (quantity + random.randint(1, 2), price)
+            total = sum(quantity * price for quantity, price in cart.values())
+            created_at = now - timedelta(days=random.uniform(0, args.days))
+            orders.append((random.choice(users), round(total, 2), random.choice(ORDER_STATUSES), "Pakistan", created_at))
+            carts.append(cart)
+        cursor.executemany(
+            "INSERT INTO orders (user_id, total_amount, status, delivery_address, created_at) VALUES (%s, %s, %s, %s, %s)",
+            orders
+        )
+        items = [
+            (order_id, product_id, quantity, price)
+            for order_id, cart in zip(inserted_ids(cursor, count), carts)
+            for product_id, (quantity, price) in cart.items()
+        ]
+        cursor.executemany("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)", items)
+        conn.commit()
+
+
+def rebuild_rollups(cursor, conn):
+    # Same backfill as migrations/003_sales_rollups.sql
+    cursor.execute("DELETE FROM sales_daily")
+    cursor.execute("DELETE FROM sales_daily_products")
+    cursor.execute(
+        "INSERT INTO sales_daily (day, orders, revenue) "
+        "SELECT DATE(created_at), COUNT(*), SUM(total_amount) FROM orders "
+        "WHERE status IN ('confirmed', 'shipped', 'delivered') GROUP BY DATE(created_at)"
+    )
+    cursor.execute(
+        "INSERT INTO sales_daily_products (day, product_id, category_id, orders, units, revenue) "
+        "SELECT DATE(o.created_at), oi.product_id, p.category_id, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price) "
+        "FROM orders o JOIN order_items oi ON oi.order_id = o.id JOIN products p ON p.id = oi.product_id "
+        "WHERE o.status IN ('confirmed', 'shipped', 'delivered') GROUP BY DATE(o.created_at), oi.product_id, p.category_id"
+    )
+    # Same backfill as migrations/008_customer_order_aggregates.sql
+    cursor.execute(
+        "UPDATE users u LEFT JOIN ("
+        "SELECT user_id, COUNT(*) AS order_count, "
+        "COALESCE(SUM(CASE WHEN status IN ('confirmed', 'shipped', 'delivered') THEN total_amount END), 0) AS lifetime_spend "
+        "FROM orders GROUP BY user_id) o ON o.user_id = u.id "
+        "SET u.order_count = COALESCE(o.order_count, 0), u.lifetime_spend = COALESCE(o.lifetime_spend, 0), u.updated_at = u.updated_at"
+    )
+    conn.commit()
+
+
+def main(args):
+    random.seed(args.seed)
+    now = datetime.now()
+    conn = mysql.connector.connect(**DATABASE_CONFIG)
+    cursor = conn.cursor()
+    try:
+        steps = [
+            ("categories", lambda: seed_categories(cursor, conn)),
+            ("users", lambda: seed_users(cursor, conn, args, now)),
+        ]
+        results = {}
+        for name, step in steps:
+            start = time.perf_counter()
+            results[name] = step()
+            print(f"{name:12} {len(results[name]):>8} rows available  ({time.perf_counter() - start:.1f}s)")
+
+        start = time.perf_counter()
+        products = seed_products(cursor, conn, args, results["categories"], now)
+        print(f"{'products':12} {len(products):>8} new, {len(products) * args.images_per_product} images  ({time.perf_counter() - start:.1f}s)")
+
+        start = time.perf_counter()
+        seed_orders(cursor, conn, args, results["users"], products, now)
+        print(f"{'orders':12} {args.orders:>8} new  ({time.perf_counter() - start:.1f}s)")
+
+        start = time.perf_counter()
+        rebuild_rollups(cursor, conn)
+        print(f"{'rollups':12} rebuilt, customer aggregates updated  ({time.perf_counter() - start:.1f}s)")
+    finally:
+        cursor.close()
+        conn.close()
+    print("Restart the API so dashboard counters and the search index pick up the new rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="total seeded users (existing seed users are kept)")
+    parser.add_argument("--products", type=int, default=1000, help="products to add")
+    parser.add_argument("--images-per-product", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=20000, help="orders to add")
+    parser.add_argument("--max-items", type=int, default=4, help="maximum distinct products per order")
+    parser.add_argument("--max-stock", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many past days")
+    parser.add_argument("--password", default="bench-password", help="password of every seeded user")
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", 12)))
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible data")
+    sys.exit(main(parser.parse_args()))
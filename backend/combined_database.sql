@@ -13,10 +13,15 @@ CREATE TABLE IF NOT EXISTS users (
     phone VARCHAR(20) NOT NULL,
     password VARCHAR(255) NOT NULL,
     status ENUM('active', 'inactive', 'blocked') DEFAULT 'active',
+    order_count INT NOT NULL DEFAULT 0,       -- Maintained by order placement
+    lifetime_spend DECIMAL(12, 2) NOT NULL DEFAULT 0, -- Confirmed/shipped/delivered orders
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_email (email),
-    INDEX idx_phone (phone)
+    INDEX idx_phone (phone),
+    INDEX idx_name (name),
+    INDEX idx_order_count (order_count, id),
+    INDEX idx_lifetime_spend (lifetime_spend, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Admins Table
@@ -64,6 +69,9 @@ CREATE TABLE IF NOT EXISTS products (
     INDEX idx_status (status),
     INDEX idx_name (name),
     INDEX idx_color (color),
+    INDEX idx_price (price),
+    INDEX idx_category_id_price (category_id, price),
+    INDEX idx_color_price (color, price),
     FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -72,12 +80,16 @@ CREATE TABLE IF NOT EXISTS product_images (
     id INT AUTO_INCREMENT PRIMARY KEY,
     product_id INT NOT NULL,
     image_url VARCHAR(1000) NOT NULL,         -- Increased length for longer URLs
+    thumbnail_url VARCHAR(1000),              -- Resized variants generated on upload
+    medium_url VARCHAR(1000),
+    content_hash CHAR(64),                    -- SHA-256 of the original; files are shared by hash
     is_primary BOOLEAN DEFAULT FALSE,
     sort_order INT DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
     INDEX idx_product_id (product_id),
-    INDEX idx_sort_order (sort_order)
+    INDEX idx_sort_order (sort_order),
+    INDEX idx_content_hash (content_hash)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Orders Table
@@ -87,6 +99,7 @@ CREATE TABLE IF NOT EXISTS orders (
     total_amount DECIMAL(10, 2) NOT NULL,
     status ENUM('pending', 'confirmed', 'shipped', 'delivered', 'cancelled') DEFAULT 'pending',
     delivery_address TEXT NOT NULL,
+    stock_applied BOOLEAN NOT NULL DEFAULT TRUE,
     payment_method VARCHAR(50) DEFAULT 'cash_on_delivery',
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -94,7 +107,10 @@ CREATE TABLE IF NOT EXISTS orders (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
     INDEX idx_status (status),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_user_id_created_at (user_id, created_at),
+    INDEX idx_status_created_at (status, created_at),
+    INDEX idx_stock_applied (stock_applied)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Order Items Table
@@ -141,6 +157,38 @@ CREATE TABLE IF NOT EXISTS activity_logs (
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Daily Sales Rollup (orders in confirmed/shipped/delivered, by order date)
+CREATE TABLE IF NOT EXISTS sales_daily (
+    day DATE PRIMARY KEY,
+    orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Daily Sales Rollup per Product
+CREATE TABLE IF NOT EXISTS sales_daily_products (
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    category_id INT NOT NULL,
+    orders INT NOT NULL DEFAULT 0,
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_id),
+    INDEX idx_product_id_day (product_id, day),
+    INDEX idx_category_id_day (category_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Idempotency Keys for order placement (see migrations/006_idempotency_keys.sql)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    order_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idempotency_key),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- User Addresses Table
 CREATE TABLE IF NOT EXISTS user_addresses (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -0,0 +1,9 @@
+-- Keyset pagination and server-side filters for GET /api/products.
+-- InnoDB secondary indexes carry the primary key, so (category_id, price)
+-- also serves the (price, id) tie-break used by the price cursors.
+USE ss_bags;
+
+ALTER TABLE products
+    ADD INDEX idx_price (price),
+    ADD INDEX idx_category_id_price (category_id, price),
+    ADD INDEX idx_color_price (color, price);
@@ -0,0 +1,7 @@
+-- Keyset pagination and status/date filters for the order listings.
+-- Both listings sort by (created_at, id) and filter by user_id or status.
+USE ss_bags;
+
+ALTER TABLE orders
+    ADD INDEX idx_user_id_created_at (user_id, created_at),
+    ADD INDEX idx_status_created_at (status, created_at);
@@ -0,0 +1,41 @@
+-- Materialized daily sales rollups behind /api/admin/reports.
+-- Creates the tables and backfills them from existing orders. Run while
+-- order status changes are paused, or re-run the backfill afterwards.
+USE ss_bags;
+
+CREATE TABLE IF NOT EXISTS sales_daily (
+    day DATE PRIMARY KEY,
+    orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS sales_daily_products (
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    category_id INT NOT NULL,
+    orders INT NOT NULL DEFAULT 0,
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_id),
+    INDEX idx_product_id_day (product_id, day),
+    INDEX idx_category_id_day (category_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill
+DELETE FROM sales_daily;
+DELETE FROM sales_daily_products;
+
+INSERT INTO sales_daily (day, orders, revenue)
+SELECT DATE(created_at), COUNT(*), SUM(total_amount)
+FROM orders
+WHERE status IN ('confirmed', 'shipped', 'delivered')
+GROUP BY DATE(created_at);
+
+INSERT INTO sales_daily_products (day, product_id, category_id, orders, units, revenue)
+SELECT DATE(o.created_at), oi.product_id, p.category_id, COUNT(DISTINCT o.id), SUM(oi.quantity), SUM(oi.quantity * oi.price)
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+JOIN products p ON p.id = oi.product_id
+WHERE o.status IN ('confirmed', 'shipped', 'delivered')
+GROUP BY DATE(o.created_at), oi.product_id, p.category_id;
@@ -0,0 +1,7 @@
+-- Resized thumbnail/medium variants recorded for each uploaded product image.
+-- Images uploaded before this change keep NULL variants and are served as originals.
+USE ss_bags;
+
+ALTER TABLE product_images
+    ADD COLUMN thumbnail_url VARCHAR(1000) AFTER image_url,
+    ADD COLUMN medium_url VARCHAR(1000) AFTER thumbnail_url;
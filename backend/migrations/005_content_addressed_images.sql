@@ -0,0 +1,8 @@
+-- Content-addressed image store: product_images rows record the SHA-256 of
+-- the original so identical uploads share files and deletes can reference-count.
+-- Rows from before this change keep NULL and their files are removed directly.
+USE ss_bags;
+
+ALTER TABLE product_images
+    ADD COLUMN content_hash CHAR(64) AFTER medium_url,
+    ADD INDEX idx_content_hash (content_hash);
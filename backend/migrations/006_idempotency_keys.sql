@@ -0,0 +1,13 @@
+-- Idempotency keys for POST /api/orders: a retried checkout carrying the same
+-- Idempotency-Key returns the order created by the first attempt.
+USE ss_bags;
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INT NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    order_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, idempotency_key),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
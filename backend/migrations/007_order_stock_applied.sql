@@ -0,0 +1,8 @@
+-- Write-behind inventory (INVENTORY_ENGINE=memory): orders are committed with
+-- stock_applied = FALSE and flagged once their stock has been written to
+-- products/inventory_logs, so unflushed orders can be applied after a crash.
+USE ss_bags;
+
+ALTER TABLE orders
+    ADD COLUMN stock_applied BOOLEAN NOT NULL DEFAULT TRUE AFTER delivery_address,
+    ADD INDEX idx_stock_applied (stock_applied);
@@ -0,0 +1,25 @@
+-- Per-customer order aggregates, kept current by order placement and status
+-- changes, so the admin customer directory never joins or groups orders.
+-- order_count counts every order; lifetime_spend sums the orders whose status
+-- counts towards sales (confirmed, shipped, delivered), like the reports.
+-- The UPDATE below backfills existing customers and can be re-run to correct drift.
+USE ss_bags;
+
+ALTER TABLE users
+    ADD COLUMN order_count INT NOT NULL DEFAULT 0 AFTER status,
+    ADD COLUMN lifetime_spend DECIMAL(12, 2) NOT NULL DEFAULT 0 AFTER order_count,
+    ADD INDEX idx_name (name),
+    ADD INDEX idx_order_count (order_count, id),
+    ADD INDEX idx_lifetime_spend (lifetime_spend, id);
+
+UPDATE users u
+LEFT JOIN (
+    SELECT user_id,
+           COUNT(*) AS order_count,
+           COALESCE(SUM(CASE WHEN status IN ('confirmed', 'shipped', 'delivered') THEN total_amount END), 0) AS lifetime_spend
+    FROM orders
+    GROUP BY user_id
+) o ON o.user_id = u.id
+SET u.order_count = COALESCE(o.order_count, 0),
+    u.lifetime_spend = COALESCE(o.lifetime_spend, 0),
+    u.updated_at = u.updated_at;
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Backend launcher script for S.S BAGS
-Run this script to start the FastAPI server
+Run this script to start the FastAPI server (development, with auto-reload).
+For production use serve.py, which runs one worker per CPU.
 """
 
 import uvicorn
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Production launcher for S.S BAGS: pre-forked uvicorn workers on one socket.
+
+The parent binds the listening socket, creates the shared worker state file
+(see app/workers.py) and forks one worker per CPU by default, each pinned to
+its own core. Workers import the app after the fork, so each one opens its
+own database pools; the parent never touches MySQL. Workers that die are
+restarted; SIGTERM or CTRL+C stops them gracefully.
+
+uvloop and httptools are used when installed. For development with
+auto-reload use run.py instead.
+
+    python serve.py --workers 8 --port 8000
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+import importlib.util
+
+import uvicorn
+from dotenv import load_dotenv
+
+# A worker that exits sooner than this after starting is considered crashing; restarts are delayed
+MIN_WORKER_LIFETIME = 5
+
+
+def bind_socket(host, port, backlog):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index, sock, args):
+    # Own process group, so CTRL+C reaches only the parent, which then stops workers in order
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if args.pin and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+    config = uvicorn.Config(
+        "app.main:app",
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        access_log=args.access_log,
+        log_level=args.log_level,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(args):
+    load_dotenv()
+    if args.workers > 1 and os.getenv("INVENTORY_ENGINE", "db") == "memory":
+        print("INVENTORY_ENGINE=memory keeps stock counters in one process; run it with --workers 1")
+        return 1
+
+    # Workers read the path at import time, after the fork
+    state_file = os.path.join(tempfile.gettempdir(), f"ssbags-workers-{os.getpid()}.state")
+    os.environ["WORKER_STATE_FILE"] = state_file
+    from app.workers import create_state_file
+    create_state_file(state_file)
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"Starting {args.workers} workers on http://{args.host}:{args.port} ({loop} event loop, {http} parser)")
+
+    workers = {}  # pid -> (index, started_at)
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, sock, args)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        workers[pid] = (index, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(args.workers):
+        spawn(index)
+
+    try:
+        while workers:
+            pid, status = os.wait()
+            if pid not in workers:
+                continue
+            index, started_at = workers.pop(pid)
+            if stopping:
+                continue
+            print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            if time.monotonic() - started_at < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not stopping:
+                spawn(index)
+    finally:
+        sock.close()
+        os.unlink(state_file)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count())))
+    parser.add_argument("--no-pin", dest="pin", action="store_false", help="do not pin each worker to one CPU")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--keep-alive", type=int, default=5, help="seconds to keep idle HTTP connections open")
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    sys.exit(main(parser.parse_args()))
@@ -213,20 +213,13 @@ function showAdminSection(sectionId, event) {
 // ============ DASHBOARD ============
 async function loadDashboard() {
     try {
-        const [usersRes, productsRes, ordersRes] = await Promise.all([
-            fetch(`${API_BASE}/admin/stats/users`, { headers: getAuthHeader() }),
-            fetch(`${API_BASE}/admin/stats/products`, { headers: getAuthHeader() }),
-            fetch(`${API_BASE}/admin/stats/orders`, { headers: getAuthHeader() })
-        ]);
+        const statsRes = await fetch(`${API_BASE}/admin/stats`, { headers: getAuthHeader() });
+        const stats = await statsRes.json();
 
-        const usersData = await usersRes.json();
-        const productsData = await productsRes.json();
-        const ordersData = await ordersRes.json();
-
-        document.getElementById('stat-users').textContent = usersData.count || 0;
-        document.getElementById('stat-products').textContent = productsData.count || 0;
-        document.getElementById('stat-orders').textContent = ordersData.count || 0;
-        document.getElementById('stat-sales').textContent = `Rs. ${(ordersData.total_sales || 0).toLocaleString()}`;
+        document.getElementById('stat-users').textContent = stats.users || 0;
+        document.getElementById('stat-products').textContent = stats.products || 0;
+        document.getElementById('stat-orders').textContent = stats.orders || 0;
+        document.getElementById('stat-sales').textContent = `Rs. ${(stats.total_sales || 0).toLocaleString()}`;
 
         // Load recent orders
         const ordersResponse = await fetch(`${API_BASE}/admin/orders?limit=5`, { headers: getAuthHeader() });
@@ -304,11 +297,18 @@ function clearProductForm() {
     document.getElementById('image-preview-container').innerHTML = '';
 }
 
-async function loadProducts() {
+let productsCursor = null;
+
+// The product list is paginated; "Load More" appends the next page
+async function loadProducts(append = false) {
     try {
-        const response = await fetch(`${API_BASE}/products`, { headers: getAuthHeader() });
+        const params = new URLSearchParams({ limit: 50 });
+        if (append && productsCursor) params.set('cursor', productsCursor);
+        const response = await fetch(`${API_BASE}/products?${params}`, { headers: getAuthHeader() });
         const data = await response.json();
-        allProducts = data.products || [];
+        allProducts = append ? allProducts.concat(data.products || []) : (data.products || []);
+        productsCursor = data.next_cursor;
+        document.getElementById('products-load-more').style.display = productsCursor ? 'inline-block' : 'none';
         displayProductsTable(allProducts);
     } catch (error) {
         console.error('Error loading products:', error);
@@ -586,11 +586,20 @@ async function deleteProduct(productId) {
 }
 
 // ============ ORDERS MANAGEMENT ============
-async function loadOrders() {
+let ordersCursor = null;
+
+// Status filtering and paging happen in the API; "Load More" appends the next page
+async function loadOrders(append = false) {
     try {
-        const response = await fetch(`${API_BASE}/admin/orders`, { headers: getAuthHeader() });
+        const statusFilter = document.getElementById('order-status-filter');
+        const params = new URLSearchParams({ limit: 50 });
+        if (statusFilter && statusFilter.value) params.set('status', statusFilter.value.toLowerCase());
+        if (append && ordersCursor) params.set('cursor', ordersCursor);
+        const response = await fetch(`${API_BASE}/admin/orders?${params}`, { headers: getAuthHeader() });
         const data = await response.json();
-        allOrders = data.orders || [];
+        allOrders = append ? allOrders.concat(data.orders || []) : (data.orders || []);
+        ordersCursor = data.next_cursor;
+        document.getElementById('orders-load-more').style.display = ordersCursor ? 'inline-block' : 'none';
         displayOrdersTable(allOrders);
     } catch (error) {
         console.error('Error loading orders:', error);
@@ -621,14 +630,7 @@ function displayOrdersTable(orders) {
 }
 
 function filterOrders() {
-    const status = document.getElementById('order-status-filter').value;
-    let filtered = allOrders;
-
-    if (status) {
-        filtered = allOrders.filter(o => o.status.toLowerCase() === status.toLowerCase());
-    }
-
-    displayOrdersTable(filtered);
+    loadOrders();
 }
 
 function viewOrderDetails(orderId) {
@@ -718,11 +720,22 @@ function closeOrderModal() {
 }
 
 // ============ CUSTOMERS MANAGEMENT ============
-async function loadCustomers() {
+let customersCursor = null;
+let customerSearchTimer = null;
+
+// Search, sort and paging happen in the API; "Load More" appends the next page
+async function loadCustomers(append = false) {
     try {
-        const response = await fetch(`${API_BASE}/admin/customers`, { headers: getAuthHeader() });
+        const params = new URLSearchParams({ limit: 50 });
+        const search = document.getElementById('customer-search').value.trim();
+        if (search) params.set('q', search);
+        params.set('sort', document.getElementById('customer-sort').value);
+        if (append && customersCursor) params.set('cursor', customersCursor);
+        const response = await fetch(`${API_BASE}/admin/customers?${params}`, { headers: getAuthHeader() });
         const data = await response.json();
-        allCustomers = data.customers || [];
+        allCustomers = append ? allCustomers.concat(data.customers || []) : (data.customers || []);
+        customersCursor = data.next_cursor;
+        document.getElementById('customers-load-more').style.display = customersCursor ? 'inline-block' : 'none';
         displayCustomersTable(allCustomers);
     } catch (error) {
         console.error('Error loading customers:', error);
@@ -730,11 +743,16 @@ async function loadCustomers() {
     }
 }
 
+function searchCustomers() {
+    clearTimeout(customerSearchTimer);
+    customerSearchTimer = setTimeout(() => loadCustomers(), 300);
+}
+
 function displayCustomersTable(customers) {
     const tbody = document.getElementById('customers-table-body');
     
     if (customers.length === 0) {
-        tbody.innerHTML = '<tr><td colspan="6">No customers found</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="7">No customers found</td></tr>';
         return;
     }
 
@@ -745,8 +763,11 @@ function displayCustomersTable(customers) {
             <td>${customer.email}</td>
             <td>${customer.phone}</td>
             <td>${customer.order_count || 0}</td>
+            <td>${Number(customer.lifetime_spend || 0).toLocaleString()}</td>
             <td>
-                <button class="action-btn delete" onclick="deactivateCustomer(${customer.id})">Deactivate</button>
+                ${customer.status === 'active'
+                    ? `<button class="action-btn delete" onclick="deactivateCustomer(${customer.id})">Deactivate</button>`
+                    : customer.status}
             </td>
         </tr>
     `).join('');
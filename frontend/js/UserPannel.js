@@ -405,11 +405,48 @@ function showSection(sectionId) {
 }
 
 // ============ PRODUCTS ============
-async function fetchProducts() {
+const PRODUCTS_PAGE_SIZE = 48;
+const PRODUCT_SORT_PARAMS = { 'price-low': 'price_asc', 'price-high': 'price_desc', 'newest': 'newest' };
+let productsQuery = null;
+
+function buildProductsQuery() {
+    const params = new URLSearchParams({ limit: PRODUCTS_PAGE_SIZE });
+    const categoryFilter = document.getElementById('category-filter');
+    const sortFilter = document.getElementById('sort-filter');
+    const searchInput = document.getElementById('search-input');
+    if (categoryFilter && categoryFilter.value) {
+        params.set('category', categoryFilter.value);
+    }
+    if (searchInput && searchInput.value.trim()) {
+        // Search results come back in relevance order, so sort is not sent
+        params.set('q', searchInput.value.trim());
+    } else if (sortFilter && PRODUCT_SORT_PARAMS[sortFilter.value]) {
+        params.set('sort', PRODUCT_SORT_PARAMS[sortFilter.value]);
+    }
+    return params.toString();
+}
+
+// Next page of the current listing: a cursor for the catalog, an offset for search results
+let productsNextPage = null;
+
+async function fetchProducts(append = false) {
     try {
-        const response = await fetch(`${API_BASE}/products`);
+        // Filtering, sorting and text search are all done by the API
+        if (!append) {
+            productsQuery = buildProductsQuery();
+            productsNextPage = null;
+        }
+        const params = new URLSearchParams(productsQuery);
+        const isSearch = params.has('q');
+        if (append && productsNextPage !== null) {
+            params.set(isSearch ? 'offset' : 'cursor', productsNextPage);
+        }
+        const response = await fetch(`${API_BASE}/${isSearch ? 'products/search' : 'products'}?${params}`);
         const data = await response.json();
-        products = data.products || [];
+        products = append ? products.concat(data.products || []) : (data.products || []);
+        productsNextPage = isSearch ? data.next_offset : data.next_cursor;
+        if (productsNextPage === undefined) productsNextPage = null;
+        document.getElementById('products-load-more').style.display = productsNextPage !== null ? 'inline-block' : 'none';
         displayProducts(products);
     } catch (error) {
         console.error('Error fetching products:', error);
@@ -417,6 +454,16 @@ async function fetchProducts() {
     }
 }
 
+function loadMoreProducts() {
+    fetchProducts(true);
+}
+
+// Prefer the resized variant over the full-size original
+function productImageUrl(product) {
+    const variant = product.image_variants && product.image_variants[0];
+    return (variant && variant.medium) || product.images[0];
+}
+
 function displayProducts(items) {
     const list = document.getElementById('products-list');
     
@@ -429,7 +476,7 @@ function displayProducts(items) {
         <div class="product-card">
             <div class="product-image-wrapper">
                 ${product.images && product.images.length > 0 ? 
-                    `<img src="${product.images[0]}" style="width:100%;height:100%;object-fit:cover;" alt="${product.name}" onerror="this.onerror=null;this.src='data:image/svg+xml,%3Csvg xmlns=\'http://www.w3.org/2000/svg\' width=\'100\' height=\'100\'%3E%3Crect fill=\'%23ddd\' width=\'100\' height=\'100\'/%3E%3Ctext x=\'50\' y=\'50\' text-anchor=\'middle\' dy=\'.3em\' fill=\'%23999\'%3EProduct%3C/text%3E%3C/svg%3E';">` : 
+                    `<img src="${productImageUrl(product)}" loading="lazy" style="width:100%;height:100%;object-fit:cover;" alt="${product.name}" onerror="this.onerror=null;this.src='data:image/svg+xml,%3Csvg xmlns=\'http://www.w3.org/2000/svg\' width=\'100\' height=\'100\'%3E%3Crect fill=\'%23ddd\' width=\'100\' height=\'100\'/%3E%3Ctext x=\'50\' y=\'50\' text-anchor=\'middle\' dy=\'.3em\' fill=\'%23999\'%3EProduct%3C/text%3E%3C/svg%3E';">` : 
                     `<img src="data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='100' height='100'%3E%3Crect fill='%23ddd' width='100' height='100'/%3E%3Ctext x='50' y='50' text-anchor='middle' dy='.3em' fill='%23999'%3EProduct%3C/text%3E%3C/svg%3E" style="width:100%;height:100%;" alt="${product.name}">`}
                 <div class="add-to-cart-overlay" onclick="addToCart(${product.id})">
                     ADD TO CART
@@ -688,27 +735,17 @@ style.textContent = `
 document.head.appendChild(style);
 
 // ============ PRODUCTS ============
-function filterProducts() {
-    const search = document.getElementById('search-input').value.toLowerCase();
-    const category = document.getElementById('category-filter').value;
-    const sort = document.getElementById('sort-filter').value;
-
-    let filtered = products.filter(p => {
-        const matchSearch = p.name.toLowerCase().includes(search) || 
-                           p.description.toLowerCase().includes(search);
-        const matchCategory = !category || p.category === category;
-        return matchSearch && matchCategory;
-    });
+let filterTimer = null;
 
-    if (sort === 'price-low') {
-        filtered.sort((a, b) => a.price - b.price);
-    } else if (sort === 'price-high') {
-        filtered.sort((a, b) => b.price - a.price);
-    } else if (sort === 'newest') {
-        filtered.sort((a, b) => b.id - a.id);
+function filterProducts() {
+    if (buildProductsQuery() === productsQuery) {
+        displayProducts(products);
+        return;
     }
 
-    displayProducts(filtered);
+    // Debounce so typing in the search box sends one request, not one per key
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(() => fetchProducts(), 250);
 }
 
 // ============ CART ============